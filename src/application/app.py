@@ -2,7 +2,9 @@ from application.amqp_handler import process
 from application.background import background_process
 from application.config import settings
 from application.container import Container
+from application.tasks.cache_warmup_task import warm_up_cache
 from infrastructure.server.server import Server
+from presentation.metrics import MetricsRouter
 from presentation.post import PostRouter
 from presentation.profile import ProfileRouter
 
@@ -11,14 +13,21 @@ post_service = Server(
     routers=[
         ProfileRouter.api_router,
         PostRouter.api_router,
+        MetricsRouter.api_router,
     ],
     start_callbacks=[
         background_process.start,
+        Container.alchemy_manager().start_replica_monitor,
+        Container.hot_keys().start,
+        Container.redis_cache().listen_invalidations,
+        warm_up_cache,
         # process.start,
         # Container.producer_client().connect,
     ],
     stop_callbacks=[
+        Container.hot_keys().flush,
         Container.redis().close,
+        Container.binary_redis().close,
         process.close,
         Container.producer_client().disconnect,
         Container.consumer_client().disconnect,
@@ -3,11 +3,20 @@ from multiprocessing import Process
 
 from application.config import settings
 from application.tasks.clickhouse_table_creation import create_tables_task
+from application.tasks.likes_task import likes_task
+from application.tasks.partitions_task import partitions_task
 from infrastructure.handlers.asyncio_handlers import safe_gather, start_task
 
 
 async def _start_background_tasks():
-    tasks = [start_task(create_tables_task(), settings.REPEAT_TIMEOUT)]
+    tasks = [
+        start_task(create_tables_task(), settings.REPEAT_TIMEOUT),
+        likes_task(flush_interval=settings.LIKES.flush_interval),
+        partitions_task(
+            check_interval=settings.PARTITIONS.check_interval,
+            retention_months=settings.PARTITIONS.retention_months,
+        ),
+    ]
     await safe_gather(*tasks)
 
 
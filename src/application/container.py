@@ -2,12 +2,24 @@ from redis.asyncio import Redis
 
 from application.config import settings
 from domain.post.registry import PostReadRegistry, PostWriteRegistry
+from domain.post.schema import PostReturnData
 from domain.profile.registry import ProfileReadRegistry, ProfileWriteRegistry
+from domain.profile.schema import ProfileReturnData
 from infrastructure.base_entities.singleton import OnlyContainer, Singleton
 from infrastructure.broker.kafka import KafkaConsumer, KafkaProducer
+from infrastructure.cache.codec import CacheCodec
+from infrastructure.cache.friend_graph import FriendGraphCache
+from infrastructure.cache.hot_keys import HotKeys
+from infrastructure.cache.likes_counter import LikesCounter
+from infrastructure.cache.local_cache import LocalCache
 from infrastructure.cache.redis_cache import RedisCache
+from infrastructure.cache.table_versions import TableVersions
+from infrastructure.cache.timeline_cache import TimelineCache
+from infrastructure.cache.trending_index import TrendingIndex
 from infrastructure.database.alchemy_gateway import SessionManager
 from infrastructure.database.clickhouse_gateway import ClickHouseManager
+from infrastructure.database.partitions import MonthlyPartitions
+from infrastructure.handlers.circuit_breaker import CircuitBreaker
 
 
 class Container(Singleton):
@@ -18,7 +30,85 @@ class Container(Singleton):
         decode_responses=True,
     )
 
-    redis_cache = OnlyContainer(RedisCache, redis=redis())
+    # Значения кеша бинарные, поэтому отдельный клиент без декодирования ответов
+    binary_redis = OnlyContainer(
+        Redis,
+        **settings.REDIS,
+        decode_responses=False,
+    )
+
+    cache_codec = OnlyContainer(
+        CacheCodec,
+        # Идентификаторы схем хранятся в заголовке значения, их нельзя переиспользовать
+        schemas={1: ProfileReturnData, 2: PostReturnData},
+        compression=settings.CACHE.compression,
+        compress_threshold=settings.CACHE.compress_threshold,
+    )
+
+    cache_breaker = OnlyContainer(
+        CircuitBreaker,
+        name="redis_cache",
+        failure_rate=settings.CACHE.breaker_failure_rate,
+        slow_call_duration=settings.CACHE.breaker_slow_call_duration,
+        window_size=settings.CACHE.breaker_window_size,
+        min_calls=settings.CACHE.breaker_min_calls,
+        open_timeout=settings.CACHE.breaker_open_timeout,
+        half_open_calls=settings.CACHE.breaker_half_open_calls,
+    )
+
+    hot_keys = OnlyContainer(
+        HotKeys,
+        redis=redis(),
+        key=f"{settings.CACHE.namespace}:hot",
+        max_size=settings.CACHE.hot_keys_max_size,
+        flush_interval=settings.CACHE.hot_keys_flush_interval,
+        kinds=("profile", "post"),
+    )
+
+    local_cache = OnlyContainer(
+        LocalCache,
+        max_entries=settings.CACHE.local_max_entries,
+        max_bytes=settings.CACHE.local_max_bytes,
+        ttl=settings.CACHE.local_ttl,
+    )
+
+    redis_cache = OnlyContainer(
+        RedisCache,
+        redis=binary_redis(),
+        serializer=cache_codec(),
+        local_cache=local_cache() if settings.CACHE.local_enabled else None,
+        invalidation_channel=settings.CACHE.invalidation_channel,
+        namespace=settings.CACHE.namespace,
+        version=settings.CACHE.version,
+        breaker=cache_breaker(),
+        hot_keys=hot_keys(),
+        negative_ttl=settings.CACHE.negative_ttl,
+    )
+
+    table_versions = OnlyContainer(TableVersions, redis=redis())
+
+    likes_counter = OnlyContainer(LikesCounter, redis=redis())
+
+    trending_index = OnlyContainer(
+        TrendingIndex,
+        redis=redis(),
+        half_life=settings.TRENDING.half_life,
+        epoch=settings.TRENDING.epoch,
+    )
+
+    friend_graph = OnlyContainer(
+        FriendGraphCache,
+        redis=redis(),
+        ttl=settings.FRIENDS.ttl,
+    )
+
+    timeline_cache = OnlyContainer(
+        TimelineCache,
+        redis=redis(),
+        size=settings.FEED.size,
+        ttl=settings.FEED.ttl,
+        high_degree_threshold=settings.FEED.high_degree_threshold,
+    )
 
     alchemy_manager = OnlyContainer(
         SessionManager,
@@ -29,6 +119,25 @@ class Container(Singleton):
         port=settings.POSTGRES.port,
         database=settings.POSTGRES.database,
         echo=settings.POSTGRES.echo,
+        pool_min_size=settings.POSTGRES.pool_min_size,
+        pool_max_size=settings.POSTGRES.pool_max_size,
+        pool_timeout=settings.POSTGRES.pool_timeout,
+        pool_recycle=settings.POSTGRES.pool_recycle,
+        pool_pre_ping=settings.POSTGRES.pool_pre_ping,
+        pgbouncer=settings.POSTGRES.pgbouncer,
+        statement_cache_size=settings.POSTGRES.statement_cache_size,
+        replicas=settings.POSTGRES.replicas,
+        replica_strategy=settings.POSTGRES.replica_strategy,
+        max_replica_lag=settings.POSTGRES.max_replica_lag,
+        replica_check_interval=settings.POSTGRES.replica_check_interval,
+        read_your_writes_window=settings.POSTGRES.read_your_writes_window,
+    )
+
+    post_partitions = OnlyContainer(
+        MonthlyPartitions,
+        session_manager=alchemy_manager(),
+        table="posts",
+        months_ahead=settings.PARTITIONS.months_ahead,
     )
 
     clickhouse_manager = OnlyContainer(
@@ -64,6 +173,7 @@ class Container(Singleton):
     profile_write_registry = OnlyContainer(
         ProfileWriteRegistry,
         session_manager=alchemy_manager(),
+        table_versions=table_versions(),
     )
 
     post_read_registry = OnlyContainer(
@@ -74,4 +184,5 @@ class Container(Singleton):
     post_write_registry = OnlyContainer(
         PostWriteRegistry,
         session_manager=alchemy_manager(),
+        trending_index=trending_index(),
     )
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from functools import partial
+from typing import Awaitable, Callable, Dict, List
+from uuid import UUID
+
+from application.config import settings
+from application.container import Container
+from infrastructure.cache.hot_keys import HotKeys
+from service.post_service import PostReadService
+from service.profile_service import ProfileReadService
+
+
+def _loaders() -> Dict[str, Callable[[List[UUID]], Awaitable]]:
+    cache = Container.redis_cache()
+    profile_service = ProfileReadService(
+        read_repository=Container.profile_read_registry(),
+        cache_repository=cache,
+        friend_graph=Container.friend_graph(),
+        table_versions=Container.table_versions(),
+    )
+    post_service = PostReadService(
+        read_repository=Container.post_read_registry(),
+        profile_repository=Container.profile_read_registry(),
+        cache_repository=cache,
+        trending_index=Container.trending_index(),
+        timeline_cache=Container.timeline_cache(),
+    )
+    # Прогрев не считается обращением: иначе прогретые ключи сами
+    # поддерживали бы себя в горячих
+    return {
+        "profile": partial(profile_service.get_many, track=False),
+        "post": partial(post_service.get_many, track=False),
+    }
+
+
+async def _warm_up(
+    hot_keys: HotKeys, limit: int, batch_size: int, concurrency: int
+) -> int:
+    ids = defaultdict(list)
+    for member in await hot_keys.top(limit):
+        kind, _, object_id = member.partition(":")
+        try:
+            ids[kind].append(UUID(object_id))
+        except ValueError:
+            continue
+
+    loaders = _loaders()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def warm(loader, batch) -> None:
+        async with semaphore:
+            await loader(batch)
+
+    # Каждая пачка - один MGET, один запрос в БД по промахам и один pipeline записи
+    await asyncio.gather(
+        *(
+            warm(loaders[kind], kind_ids[start : start + batch_size])
+            for kind, kind_ids in ids.items()
+            if kind in loaders
+            for start in range(0, len(kind_ids), batch_size)
+        )
+    )
+    return sum(len(kind_ids) for kind, kind_ids in ids.items() if kind in loaders)
+
+
+async def warm_up_cache(
+    hot_keys: HotKeys = Container.hot_keys(),
+    limit: int = settings.WARMUP.limit,
+    batch_size: int = settings.WARMUP.batch_size,
+    concurrency: int = settings.WARMUP.concurrency,
+    budget: float = settings.WARMUP.budget,
+) -> None:
+    started = time.monotonic()
+    try:
+        warmed = await asyncio.wait_for(
+            _warm_up(hot_keys, limit, batch_size, concurrency), timeout=budget
+        )
+        logging.info(
+            f"Прогрев кеша: {warmed} объектов за {time.monotonic() - started:.1f} с"
+        )
+    except asyncio.TimeoutError:
+        logging.warning(f"Прогрев кеша прерван, бюджет {budget} с исчерпан")
+    except Exception as error:
+        logging.error(f"Ошибка прогрева кеша: {error}")
@@ -1,27 +1,30 @@
-from asyncio import Queue
+import asyncio
+import logging
 
-from redis import Redis
-
-from application.config import settings
 from application.container import Container
-from domain.post.registry import PostReadRegistry, PostWriteRegistry
-from infrastructure.exceptions.profile_exceptions import PostNotFound
+from domain.post.registry import PostWriteRegistry
+from infrastructure.cache.likes_counter import LikesCounter
 
 
-async def put_likes(
-    post_uuid: str,
-    post_read: PostReadRegistry = Container.post_read_registry(),
+async def flush_likes(
+    likes_counter: LikesCounter = Container.likes_counter(),
     post_write: PostWriteRegistry = Container.post_write_registry(),
-) -> None:
-    if existing_post := await post_read.get(post_uuid=post_uuid):
-        await post_write.put_like(post_uuid=post_uuid, likes_count=existing_post.likes)
-    raise PostNotFound
-
-
-async def accumulate_data(redis: Redis = Container.redis()):
-    likes_queue = Queue(maxsize=settings.LIKES_COUNT)
-    data = await redis.g
-
-
-async def likes_task(post_uuid: str, redis: Redis = Container.redis()):
-    await redis.set(name=post_uuid, value=1)
+) -> int:
+    batch = await likes_counter.drain()
+    if not batch.deltas:
+        return 0
+    # Пачка, уже примененная другим воркером или до сбоя ack, пропускается
+    updated = await post_write.put_likes(deltas=batch.deltas, batch_id=batch.batch_id)
+    await likes_counter.ack(batch.batch_id)
+    logging.info(f"Сброшены лайки для {updated} постов")
+    return updated
+
+
+async def likes_task(flush_interval: int | float) -> None:
+    logging.info("Инициализация сброса лайков в Postgres")
+    while True:
+        try:
+            await flush_likes()
+        except Exception as error:
+            logging.error(f"Ошибка сброса лайков: {error}")
+        await asyncio.sleep(flush_interval)
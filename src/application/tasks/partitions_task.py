@@ -0,0 +1,31 @@
+import asyncio
+import logging
+from datetime import date
+
+from application.container import Container
+from infrastructure.database.partitions import (
+    MonthlyPartitions,
+    add_months,
+    month_start,
+)
+
+
+async def maintain_partitions(
+    retention_months: int,
+    partitions: MonthlyPartitions = Container.post_partitions(),
+) -> None:
+    await partitions.ensure()
+    if retention_months > 0:
+        # Секция отсоединяется, только когда целиком старше срока хранения
+        cutoff = add_months(month_start(date.today()), -retention_months)
+        await partitions.detach_older_than(cutoff)
+
+
+async def partitions_task(check_interval: int | float, retention_months: int) -> None:
+    logging.info("Инициализация обслуживания секций posts")
+    while True:
+        try:
+            await maintain_partitions(retention_months)
+        except Exception as error:
+            logging.error(f"Ошибка обслуживания секций posts: {error}")
+        await asyncio.sleep(check_interval)
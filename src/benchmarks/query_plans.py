@@ -0,0 +1,304 @@
+"""
+Регрессия планов запросов регистров: EXPLAIN (FORMAT JSON) на локальном Postgres.
+
+Запуск из src, схема должна быть накатана (alembic upgrade head):
+    python -m benchmarks.query_plans [--profiles 100000] [--friends 10]
+                                     [--max-cost 1000] [--host localhost]
+
+Синтетические данные вставляются в одной транзакции единицы работы, после
+проверки она откатывается, поэтому база остается прежней. Каждый метод
+чтения регистров вызывается как есть, его SQL перехватывается и проверяется
+через EXPLAIN. Код выхода 1, если запрос читает таблицу seq scan'ом,
+оценка стоимости выше --max-cost или запрос с подсказкой created_at читает
+больше секций posts, чем ожидается. Число прочитанных секций печатается для
+всех запросов: поиск поста только по uuid проверяет каждую секцию.
+"""
+
+import argparse
+import asyncio
+import re
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import event, text
+
+from application.config import settings
+from domain.post.registry import PostReadRegistry
+from domain.profile.registry import ProfileReadRegistry
+from domain.profile.schema import ProfileFilter
+from infrastructure.database.alchemy_gateway import SessionManager
+from infrastructure.database.unit_of_work import UnitOfWork
+
+seed_statements = (
+    """
+    INSERT INTO profiles (uuid, user_uuid, first_name, last_name, occupation,
+                          status, bio, created_at, updated_at)
+    SELECT gen_random_uuid(), 'plan-user-' || i, 'Имя' || (i % 1000),
+           'Фамилия' || (i % 5000), 'профессия', 'статус', 'о себе',
+           now() - make_interval(secs => i), now() - make_interval(secs => i / 2.0)
+    FROM generate_series(1, :profiles) AS i
+    """,
+    """
+    INSERT INTO posts (uuid, header, hashtag, body, likes, profile_id,
+                       created_at, updated_at)
+    SELECT gen_random_uuid(), 'Заголовок ' || n, '#тег' || (n % 500),
+           'Текст поста номер ' || n, n % 1000, uuid, created_at, updated_at
+    FROM (
+        SELECT uuid, created_at, updated_at, row_number() OVER () AS n
+        FROM profiles WHERE user_uuid LIKE 'plan-user-%'
+    ) AS numbered
+    """,
+    """
+    WITH numbered AS (
+        SELECT uuid, row_number() OVER (ORDER BY uuid) - 1 AS n
+        FROM profiles WHERE user_uuid LIKE 'plan-user-%'
+    )
+    INSERT INTO friends (uuid, profile_id, friend_id, created_at, updated_at)
+    SELECT gen_random_uuid(), a.uuid, b.uuid, now(), now()
+    FROM numbered AS a
+    CROSS JOIN generate_series(1, :friends) AS step
+    JOIN numbered AS b ON b.n = (a.n + step * 7919) % :profiles
+    ON CONFLICT DO NOTHING
+    """,
+    "ANALYZE profiles, posts, friends",
+)
+
+partition_pattern = re.compile(r"^posts_(legacy|p\d{4}_\d{2})$")
+# Запросы, которые должны отсекать секции: {имя: сколько секций можно читать}
+partition_limits = {
+    "post.get(created_at)": 1,
+    "post.get_many_rows(created_at)": 1,
+}
+
+
+class StatementRecorder:
+    """
+    Запоминает SQL и параметры, которые регистр отправил в драйвер
+    """
+
+    def __init__(self) -> None:
+        self.statements: List[Tuple[str, Any]] = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith("EXPLAIN"):
+            self.statements.append((statement, parameters))
+
+    def take(self) -> List[Tuple[str, Any]]:
+        statements, self.statements = self.statements, []
+        return statements
+
+
+def plan_nodes(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from plan_nodes(child)
+
+
+async def seed(unit_of_work: UnitOfWork, profiles: int, friends: int) -> dict:
+    for statement in seed_statements:
+        await unit_of_work.connection.execute(
+            text(statement), {"profiles": profiles, "friends": friends}
+        )
+    # Образец из середины, чтобы значения не попадали на края индексов
+    sample = (
+        (
+            await unit_of_work.connection.execute(
+                text(
+                    "SELECT p.uuid, p.user_uuid, p.first_name, "
+                    "posts.uuid AS post, posts.header, "
+                    "posts.created_at AS post_created_at "
+                    "FROM profiles p JOIN posts ON posts.profile_id = p.uuid "
+                    "WHERE p.user_uuid = :user_uuid"
+                ),
+                {"user_uuid": f"plan-user-{profiles // 2}"},
+            )
+        )
+        .mappings()
+        .one()
+    )
+    neighbours = (
+        await unit_of_work.connection.execute(
+            text(
+                "SELECT uuid FROM profiles WHERE user_uuid LIKE 'plan-user-%' LIMIT 10"
+            )
+        )
+    ).scalars()
+    friend_ids = (
+        await unit_of_work.connection.execute(
+            text("SELECT friend_id FROM friends WHERE profile_id = :uuid"),
+            {"uuid": sample["uuid"]},
+        )
+    ).scalars()
+    return dict(sample) | {
+        "neighbours": list(neighbours),
+        "friend_ids": list(friend_ids),
+    }
+
+
+def registry_queries(
+    profiles: ProfileReadRegistry, posts: PostReadRegistry, sample: dict
+) -> Iterator[Tuple[str, Callable[[], Awaitable[Any]]]]:
+    prof_uuid, neighbours = sample["uuid"], sample["neighbours"]
+    friend_ids = sample["friend_ids"] or neighbours[:1]
+
+    yield "profile.get", lambda: profiles.get(prof_uuid)
+    yield "profile.get_many", lambda: profiles.get_many(neighbours)
+    yield "profile.get_many_rows", lambda: profiles.get_many_rows(neighbours)
+    yield "profile.get_by_user_uuid", lambda: profiles.get_by_user_uuid(
+        sample["user_uuid"]
+    )
+    yield "profile.find", lambda: profiles.find(ProfileFilter())
+    yield "profile.find(first_name)", lambda: profiles.find(
+        ProfileFilter(first_name=sample["first_name"])
+    )
+    yield "profile.get_follower_ids", lambda: profiles.get_follower_ids(
+        prof_uuid, limit=1000
+    )
+    yield "profile.get_friend_ids", lambda: profiles.get_friend_ids(prof_uuid)
+    yield "profile.get_friend_ids(among)", lambda: profiles.get_friend_ids(
+        prof_uuid, among=friend_ids
+    )
+    yield "profile.get_friend_ids_many", lambda: profiles.get_friend_ids_many(
+        neighbours
+    )
+    yield "profile.check_existing_friend", lambda: profiles.check_existing_friend(
+        prof_uuid, friend_ids[0]
+    )
+
+    yield "post.get", lambda: posts.get(sample["post"])
+    yield "post.get(created_at)", lambda: posts.get(
+        sample["post"], created_at=sample["post_created_at"]
+    )
+    yield "post.get_many", lambda: posts.get_many([sample["post"]])
+    yield "post.get_many_rows", lambda: posts.get_many_rows([sample["post"]])
+    yield "post.get_many_rows(created_at)", lambda: posts.get_many_rows(
+        [sample["post"]], created_at=sample["post_created_at"]
+    )
+    yield "post.get_recent_by_authors", lambda: posts.get_recent_by_authors(
+        neighbours, limit=20
+    )
+    query = sample["header"]
+    yield "post.search", lambda: posts.search(query, limit=20)
+    yield "post.search(snippets)", lambda: posts.search(query, limit=20, snippets=True)
+    # Границы по created_at должны отсекать секции posts
+    month_ago = datetime.now() - timedelta(days=30)
+    yield "post.get_list(created_after)", lambda: posts.get_list(
+        parameter="-created_at", limit=50, created_after=month_ago
+    )
+    yield "post.search(created_after)", lambda: posts.search(
+        query, limit=20, created_after=month_ago
+    )
+
+    for name, registry in (("profile", profiles), ("post", posts)):
+        for field in registry.sortable_fields:
+            for parameter in (field, f"-{field}"):
+                yield f"{name}.get_list({parameter})", _page_pair(registry, parameter)
+
+
+def _page_pair(registry: Any, parameter: str) -> Callable[[], Awaitable[Any]]:
+    # Первая страница и следующая по курсору - два разных запроса
+    async def call() -> None:
+        _, cursor = await registry.get_list(parameter=parameter, limit=50)
+        await registry.get_list(parameter=parameter, limit=50, cursor=cursor)
+
+    return call
+
+
+async def check(
+    unit_of_work: UnitOfWork,
+    statement: str,
+    parameters: Any,
+    max_cost: float,
+    max_partitions: Optional[int] = None,
+) -> Tuple[float, int, List[str]]:
+    result = await unit_of_work.connection.exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {statement}", parameters
+    )
+    raw = result.scalar_one()
+    plan = (orjson.loads(raw) if isinstance(raw, (str, bytes)) else raw)[0]["Plan"]
+    problems = [
+        f"seq scan по {node['Relation Name']}"
+        for node in plan_nodes(plan)
+        if node["Node Type"] == "Seq Scan"
+    ]
+    if plan["Total Cost"] > max_cost:
+        problems.append(f"стоимость {plan['Total Cost']} > {max_cost}")
+    partitions = {
+        node["Relation Name"]
+        for node in plan_nodes(plan)
+        if partition_pattern.match(node.get("Relation Name", ""))
+    }
+    if max_partitions is not None and len(partitions) > max_partitions:
+        problems.append(f"секций posts {len(partitions)} > {max_partitions}")
+    return plan["Total Cost"], len(partitions), problems
+
+
+class _Rollback(Exception):
+    pass
+
+
+async def run(args: argparse.Namespace) -> int:
+    manager = SessionManager(
+        host=args.host,
+        port=args.port,
+        dialect=settings.POSTGRES.dialect,
+        login=settings.POSTGRES.login,
+        password=settings.POSTGRES.password,
+        database=args.database,
+        echo=False,
+    )
+    profiles = ProfileReadRegistry(session_manager=manager)
+    posts = PostReadRegistry(session_manager=manager)
+    recorder = StatementRecorder()
+    failed = 0
+
+    try:
+        async with manager.unit_of_work() as unit_of_work:
+            sample = await seed(unit_of_work, args.profiles, args.friends)
+            event.listen(
+                unit_of_work.connection.sync_connection,
+                "before_cursor_execute",
+                recorder,
+            )
+            for name, call in registry_queries(profiles, posts, sample):
+                recorder.take()
+                await call()
+                for index, (statement, parameters) in enumerate(recorder.take()):
+                    cost, partitions, problems = await check(
+                        unit_of_work,
+                        statement,
+                        parameters,
+                        args.max_cost,
+                        partition_limits.get(name),
+                    )
+                    label = name if not index else f"{name} #{index + 1}"
+                    status = "FAIL" if problems else "ok"
+                    print(
+                        f"{status:<5} {label:<40} {cost:>10.2f} {partitions:>4}  "
+                        f"{'; '.join(problems)}"
+                    )
+                    failed += bool(problems)
+            # Данные нужны только на время проверки
+            raise _Rollback
+    except _Rollback:
+        pass
+
+    print(f"\nЗапросов с проблемами: {failed}")
+    return 1 if failed else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--profiles", type=int, default=100_000)
+    parser.add_argument("--friends", type=int, default=10)
+    parser.add_argument("--max-cost", type=float, default=1000)
+    parser.add_argument("--host", default=settings.POSTGRES.host)
+    parser.add_argument("--port", type=int, default=settings.POSTGRES.port)
+    parser.add_argument("--database", default=settings.POSTGRES.database)
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
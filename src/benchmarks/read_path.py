@@ -0,0 +1,182 @@
+"""
+Сравнение пути чтения: ORM + response_model против строк Core + ORJSONRoute.
+
+Запуск из src:
+    python -m benchmarks.read_path [--rows 500] [--requests 2000]
+
+1. Материализация строк: select(Profile) со scalars() против
+   select(*columns) с mappings() на SQLite в памяти (накладные расходы
+   SQLAlchemy, без сети).
+2. Ответ HTTP: те же данные через обычный APIRoute с response_model
+   и через ORJSONRoute, для одного объекта и страниц списка.
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime
+from typing import Awaitable, Callable, List
+
+from fastapi import APIRouter, FastAPI
+from fastapi.routing import APIRoute
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from domain.post.schema import PostPage, PostReturnData
+from domain.profile.schema import ProfilePage, ProfileReturnData
+from infrastructure.database.models import Profile
+from infrastructure.server.routing import ORJSONRoute
+
+
+def measure(name: str, func: Callable[[], object], repeat: int) -> float:
+    func()
+    started = time.process_time()
+    for _ in range(repeat):
+        func()
+    per_call = (time.process_time() - started) / repeat * 1e6
+    print(f"  {name:<40} {per_call:10.1f} мкс CPU")
+    return per_call
+
+
+async def ameasure(
+    name: str, func: Callable[[], Awaitable[object]], repeat: int
+) -> float:
+    await func()
+    started = time.process_time()
+    for _ in range(repeat):
+        await func()
+    per_call = (time.process_time() - started) / repeat * 1e6
+    print(f"  {name:<40} {per_call:10.1f} мкс CPU")
+    return per_call
+
+
+def compare(title: str, baseline: float, optimized: float) -> None:
+    print(f"  -> {title}: x{baseline / optimized:.2f}\n")
+
+
+def profile_rows(count: int) -> List[dict]:
+    now = datetime.now()
+    return [
+        {
+            "uuid": uuid.uuid4(),
+            "user_uuid": str(uuid.uuid4()),
+            "first_name": "Иван",
+            "last_name": "Иванов",
+            "occupation": "инженер",
+            "status": "на связи",
+            "bio": "Пишу код и читаю книги. " * 4,
+            "file_uuid": str(uuid.uuid4()),
+            "created_at": now,
+            "updated_at": now,
+        }
+        for _ in range(count)
+    ]
+
+
+def post_rows(count: int) -> List[dict]:
+    now = datetime.now()
+    return [
+        {
+            "uuid": uuid.uuid4(),
+            "header": "Заголовок поста",
+            "hashtag": "#новости",
+            "body": "Текст поста. " * 20,
+            "likes": index,
+            "profile_id": uuid.uuid4(),
+            "created_at": now,
+            "updated_at": now,
+        }
+        for index in range(count)
+    ]
+
+
+def bench_materialization(rows: int, repeat: int) -> None:
+    print(f"Материализация {rows} профилей")
+    engine = create_engine("sqlite://")
+    Profile.__table__.create(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(Profile), profile_rows(rows))
+
+    def orm() -> None:
+        with Session(engine) as session:
+            for profile in session.scalars(select(Profile)).all():
+                ProfileReturnData.model_validate(profile, from_attributes=True)
+
+    def core() -> None:
+        with Session(engine) as session:
+            for row in (
+                session.execute(select(*Profile.__table__.columns)).mappings().all()
+            ):
+                ProfileReturnData.model_construct(**row)
+
+    baseline = measure("ORM + model_validate(from_attributes)", orm, repeat)
+    optimized = measure("Core mappings + model_construct", core, repeat)
+    compare("материализация", baseline, optimized)
+
+
+def build_app(route_class: type, rows: int) -> FastAPI:
+    profiles = profile_rows(rows)
+    posts = post_rows(rows)
+    profile = ProfileReturnData.model_construct(**profiles[0])
+    post = PostReturnData.model_construct(**posts[0])
+    router = APIRouter(route_class=route_class)
+
+    @router.get("/profile/one", response_model=ProfileReturnData)
+    async def get_profile() -> ProfileReturnData:
+        return profile
+
+    @router.get("/post/one", response_model=PostReturnData)
+    async def get_post() -> PostReturnData:
+        return post
+
+    @router.get("/profile/all", response_model=ProfilePage)
+    async def profile_list() -> ProfilePage:
+        return {"items": profiles, "next_cursor": "cursor"}
+
+    @router.get("/post/all", response_model=PostPage)
+    async def post_list() -> PostPage:
+        return {"items": posts, "next_cursor": "cursor"}
+
+    app = FastAPI()
+    app.include_router(router)
+    return app
+
+
+async def bench_responses(rows: int, repeat: int) -> None:
+    clients = {
+        name: AsyncClient(
+            transport=ASGITransport(app=build_app(route_class, rows)),
+            base_url="http://benchmark",
+        )
+        for name, route_class in (
+            ("APIRoute + response_model", APIRoute),
+            ("ORJSONRoute", ORJSONRoute),
+        )
+    }
+    for path, count in (
+        ("/profile/one", repeat),
+        ("/post/one", repeat),
+        ("/profile/all", max(repeat // 20, 10)),
+        ("/post/all", max(repeat // 20, 10)),
+    ):
+        print(f"GET {path}")
+        baseline, optimized = [
+            await ameasure(name, lambda client=client: client.get(path), count)
+            for name, client in clients.items()
+        ]
+        compare(path, baseline, optimized)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    bench_materialization(args.rows, max(args.requests // 20, 10))
+    asyncio.run(bench_responses(args.rows, args.requests))
+
+
+if __name__ == "__main__":
+    main()
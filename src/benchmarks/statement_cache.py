@@ -0,0 +1,116 @@
+"""
+Накладные расходы на вызов горячих запросов регистров: выражение, собираемое
+при каждом вызове, против собранного один раз с bindparam.
+
+Запуск из src:
+    python -m benchmarks.statement_cache [--calls 20000]
+
+1. Сборка выражения и ключ кеша компиляции (без БД).
+2. Полный execute на SQLite в памяти: кеш компиляции SQLAlchemy попадает
+   в обоих случаях, разница - в сборке выражения и его ключе.
+3. Текст SQL для postgresql+asyncpg: значения передаются параметрами, текст
+   одинаков между вызовами, поэтому кеш prepared statements asyncpg
+   (statement_cache_size в SessionManager) переиспользуется.
+"""
+
+import argparse
+import time
+import uuid
+from typing import Callable
+
+from sqlalchemy import bindparam, create_engine, insert, lambda_stmt, select
+from sqlalchemy.dialects.postgresql import asyncpg
+from sqlalchemy.orm import Session
+
+from infrastructure.database.models import Profile
+
+
+def measure(name: str, func: Callable[[], object], calls: int) -> float:
+    func()
+    started = time.process_time()
+    for _ in range(calls):
+        func()
+    per_call = (time.process_time() - started) / calls * 1e6
+    print(f"  {name:<36} {per_call:10.2f} мкс CPU")
+    return per_call
+
+
+def compare(baseline: float, optimized: float) -> None:
+    print(f"  -> x{baseline / optimized:.1f}\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+
+    prof_uuid = uuid.uuid4()
+    prebuilt = select(Profile).filter(Profile.uuid == bindparam("prof_uuid"))
+
+    def inline():
+        return select(Profile).filter(Profile.uuid == prof_uuid)
+
+    def lambda_built():
+        return lambda_stmt(lambda: select(Profile)) + (
+            lambda stmt: stmt.filter(Profile.uuid == prof_uuid)
+        )
+
+    print("Сборка выражения + ключ кеша компиляции")
+    baseline = measure(
+        "select(...).filter(...)",
+        lambda: inline()._generate_cache_key(),
+        args.calls,
+    )
+    measure(
+        "lambda_stmt",
+        lambda: lambda_built()._generate_cache_key(),
+        args.calls,
+    )
+    optimized = measure(
+        "собранный заранее + bindparam",
+        lambda: prebuilt._generate_cache_key(),
+        args.calls,
+    )
+    compare(baseline, optimized)
+
+    print("execute на SQLite (ProfileReadRegistry.get)")
+    engine = create_engine("sqlite://")
+    Profile.__table__.create(engine)
+    with engine.begin() as connection:
+        connection.execute(
+            insert(Profile),
+            [{"uuid": prof_uuid, "user_uuid": "user", "first_name": "Иван"}],
+        )
+    calls = max(args.calls // 10, 100)
+    with Session(engine) as session:
+        baseline = measure(
+            "select(...).filter(...)",
+            lambda: session.execute(inline()).scalar_one_or_none(),
+            calls,
+        )
+        optimized = measure(
+            "собранный заранее + bindparam",
+            lambda: session.execute(
+                prebuilt, {"prof_uuid": prof_uuid}
+            ).scalar_one_or_none(),
+            calls,
+        )
+    compare(baseline, optimized)
+
+    dialect = asyncpg.dialect()
+    texts = {
+        str(prebuilt.compile(dialect=dialect)),
+        *(
+            str(
+                select(Profile)
+                .filter(Profile.uuid == uuid.uuid4())
+                .compile(dialect=dialect)
+            )
+            for _ in range(3)
+        ),
+    }
+    print(f"Уникальных текстов SQL для asyncpg на 4 вызова: {len(texts)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,56 +1,262 @@
-from typing import Any, List, Optional, Union
-from uuid import UUID
+from datetime import datetime, timedelta
+from functools import partial
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Set, Tuple, Union
+from uuid import UUID, uuid4
 
 from asyncpg import UniqueViolationError
-from sqlalchemy import delete, insert, select, update
+from sqlalchemy import UUID as SAUUID
+from sqlalchemy import (
+    Integer,
+    RowMapping,
+    Select,
+    any_,
+    bindparam,
+    column,
+    delete,
+    func,
+    insert,
+    select,
+    text,
+    tuple_,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from domain.post.schema import CreatePost
+from domain.post.schema import BulkItemStatus, CreatePost
 from infrastructure.base_entities.abs_repository import (
     AbstractReadRepository,
     AbstractWriteRepository,
 )
+from infrastructure.base_entities.base_pagination import KeysetPagination
+from infrastructure.cache.trending_index import TrendingIndex
 from infrastructure.database.alchemy_gateway import SessionManager
-from infrastructure.database.models import Post
+from infrastructure.database.expressions import uuid_array
+from infrastructure.database.models import LikeBatch, Post, PostAuthor, Profile
+from infrastructure.database.unit_of_work import run_after_commit
+from infrastructure.exceptions.pagination_exceptions import InvalidCursor
 from infrastructure.exceptions.profile_exceptions import PostAlreadyExists
 
 
 class PostReadRegistry(AbstractReadRepository):
+    sortable_fields = ("created_at", "updated_at", "likes", "header")
+    search_config = "russian"
+    headline_options = "MaxFragments=2, MaxWords=25, MinWords=8"
+
     def __init__(self, session_manager: SessionManager):
         super().__init__()
         self.model = Post
+        self.pagination = KeysetPagination(
+            model=self.model, sortable_fields=self.sortable_fields
+        )
+        self.columns = [
+            column for column in self.model.__table__.columns if column.computed is None
+        ]
+        # Собирается один раз, см. ProfileReadRegistry
+        self._get_stmt = select(self.model).filter(
+            self.model.uuid == bindparam("post_uuid")
+        )
+        self._get_at_stmt = self._get_stmt.filter(
+            self.model.created_at == bindparam("created_at")
+        )
+        # Чтения уходят на реплики, см. SessionManager.choose_read_factory
         self.transactional_session: async_sessionmaker = (
-            session_manager.transactional_session
+            session_manager.read_session_factory
         )
         self.async_session_factory: async_sessionmaker = (
+            session_manager.read_session_factory
+        )
+        # Все, что кладется в кеш, читается с primary
+        self.primary_session_factory: async_sessionmaker = (
             session_manager.async_session_factory
         )
 
-    async def get(self, post_uuid: Union[UUID, str]) -> Optional[Post]:
+    async def get(
+        self, post_uuid: Union[UUID, str], created_at: Optional[datetime] = None
+    ) -> Optional[Post]:
+        """
+        posts секционирована по created_at, а uuid - нет: без created_at поиск
+        проверяет индекс первичного ключа каждой секции. Известное время
+        публикации сводит его к одной секции
+        """
         async with self.async_session_factory() as session:
-            stmt = select(self.model).filter(self.model.uuid == post_uuid)
-            result = await session.execute(stmt)
+            if created_at is None:
+                result = await session.execute(self._get_stmt, {"post_uuid": post_uuid})
+            else:
+                result = await session.execute(
+                    self._get_at_stmt,
+                    {"post_uuid": post_uuid, "created_at": created_at},
+                )
             answer = result.scalar_one_or_none()
         return answer
 
+    async def get_many(self, post_uuids: Sequence[Union[UUID, str]]) -> List[Post]:
+        # Как и get без created_at, проверяет каждую секцию posts
+        if not post_uuids:
+            return []
+        async with self.async_session_factory() as session:
+            stmt = select(self.model).filter(
+                self.model.uuid == any_(uuid_array("post_uuids", post_uuids))
+            )
+            result = await session.execute(stmt)
+            return result.scalars().all()
+
+    async def get_many_rows(
+        self,
+        post_uuids: Sequence[Union[UUID, str]],
+        primary: bool = False,
+        created_at: Optional[datetime] = None,
+    ) -> List[RowMapping]:
+        """
+        То же, что get_many, но без ORM: строки колонок таблицы.
+        primary=True читает с primary - так заполняется кеш, чтобы отставание
+        реплики не закрепилось в нем на ttl. created_at - общее время публикации
+        искомых постов: поиск идет в одной секции вместо всех
+        """
+        if not post_uuids:
+            return []
+        factory = (
+            self.primary_session_factory if primary else self.async_session_factory
+        )
+        async with factory() as session:
+            stmt = select(*self.columns).filter(
+                self.model.uuid == any_(uuid_array("post_uuids", post_uuids))
+            )
+            if created_at is not None:
+                stmt = stmt.filter(self.model.created_at == created_at)
+            result = await session.execute(stmt)
+            return result.mappings().all()
+
+    async def get_recent_by_authors(
+        self,
+        profile_uuids: Sequence[Union[UUID, str]],
+        limit: int,
+        before: Optional[datetime] = None,
+        before_uuid: Optional[UUID] = None,
+    ) -> List[Post]:
+        stmt = select(self.model).filter(
+            self.model.profile_id == any_(uuid_array("profile_uuids", profile_uuids))
+        )
+        if before and before_uuid:
+            # Тот же порядок (время, uuid), что и у ленты в TimelineCache:
+            # посты с одинаковым временем не теряются на стыке страниц
+            stmt = stmt.filter(
+                tuple_(self.model.created_at, self.model.uuid) < (before, before_uuid),
+                self.model.created_at <= before,
+            )
+        elif before:
+            stmt = stmt.filter(self.model.created_at < before)
+        stmt = stmt.order_by(self.model.created_at.desc(), self.model.uuid.desc())
+        stmt = stmt.limit(limit)
+        async with self.async_session_factory() as session:
+            result = await session.execute(stmt)
+            return result.scalars().all()
+
+    def _created_between(
+        self,
+        stmt: Select,
+        created_after: Optional[datetime],
+        created_before: Optional[datetime],
+    ) -> Select:
+        # posts секционирована по created_at: с границами Postgres читает
+        # только секции нужных месяцев
+        if created_after is not None:
+            stmt = stmt.where(self.model.created_at >= created_after)
+        if created_before is not None:
+            stmt = stmt.where(self.model.created_at < created_before)
+        return stmt
+
     async def get_list(
         self,
-        parameter: Any = "created_at",
-    ) -> Optional[List[Post]]:
+        parameter: str = "created_at",
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+    ) -> Tuple[List[RowMapping], Optional[str]]:
+        stmt = self.pagination.paginate(
+            self._created_between(select(*self.columns), created_after, created_before),
+            parameter=parameter,
+            limit=limit,
+            cursor=cursor,
+        )
         async with self.async_session_factory() as session:
-            final = None
-            if option := getattr(self.model, parameter):
-                stmt = select(self.model).order_by(option)
-                result = await session.execute(stmt)
-                final = result.scalars().all()
-        return final
+            result = await session.execute(stmt)
+            rows = result.mappings().all()
+        return self.pagination.page(rows, parameter=parameter, limit=limit)
+
+    async def stream(
+        self, chunk_size: int = 1000
+    ) -> AsyncIterator[Sequence[RowMapping]]:
+        stmt = select(*self.columns).execution_options(yield_per=chunk_size)
+        async with self.async_session_factory() as session:
+            result = await session.stream(stmt)
+            async for partition in result.mappings().partitions():
+                yield partition
+
+    async def search(
+        self,
+        query: str,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        snippets: bool = False,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+    ) -> Tuple[List[RowMapping], Optional[str]]:
+        ts_query = func.websearch_to_tsquery(self.search_config, query)
+        rank = func.ts_rank_cd(self.model.search_vector, ts_query)
+        stmt = self._created_between(
+            select(*self.columns, rank.label("rank")).where(
+                self.model.search_vector.bool_op("@@")(ts_query)
+            ),
+            created_after,
+            created_before,
+        )
+        if cursor:
+            last_rank, last_uuid = self.pagination.load_cursor(cursor, "rank")
+            try:
+                bound = tuple_(float(last_rank), UUID(last_uuid))
+            except (TypeError, ValueError):
+                raise InvalidCursor
+            stmt = stmt.where(tuple_(rank, self.model.uuid) < bound)
+        limit = self.pagination.clamp_limit(limit)
+        stmt = stmt.order_by(rank.desc(), self.model.uuid.desc()).limit(limit + 1)
+        if snippets:
+            # ts_headline дорогой, поэтому считается только для строк страницы
+            page = stmt.subquery()
+            stmt = select(
+                page,
+                func.ts_headline(
+                    self.search_config, page.c.body, ts_query, self.headline_options
+                ).label("snippet"),
+            ).order_by(page.c.rank.desc(), page.c.uuid.desc())
+        async with self.async_session_factory() as session:
+            result = await session.execute(stmt)
+            rows = result.mappings().all()
+        items = rows[:limit]
+        if len(rows) <= limit:
+            return items, None
+        return items, self.pagination.encode_cursor(
+            parameter="rank", value=items[-1]["rank"], last_uuid=items[-1]["uuid"]
+        )
 
 
 class PostWriteRegistry(AbstractWriteRepository):
-    def __init__(self, session_manager: SessionManager):
+    copy_threshold = 1000
+    likes_batch_size = 5000
+    # Сколько помнить примененные пачки лайков, с запасом на сбои ack
+    likes_batch_retention = timedelta(days=1)
+
+    def __init__(
+        self,
+        session_manager: SessionManager,
+        trending_index: Optional[TrendingIndex] = None,
+    ):
         super().__init__()
         self.model = Post
+        self.trending = trending_index
         self.transactional_session: async_sessionmaker = (
             session_manager.transactional_session
         )
@@ -67,16 +273,146 @@ class PostWriteRegistry(AbstractWriteRepository):
                 result = await session.execute(stmt)
                 await session.commit()
                 answer = result.scalar_one_or_none()
+            if answer is not None:
+                await self._trend_add(answer.hashtag, moment=answer.created_at)
             return answer
         except (UniqueViolationError, IntegrityError):
             raise PostAlreadyExists
 
+    async def _trend_add(self, *hashtags: str, moment: datetime) -> None:
+        # Индекс трендов меняется только после коммита записи
+        if self.trending is not None and hashtags:
+            await run_after_commit(partial(self.trending.add, *hashtags, moment=moment))
+
+    async def _trend_remove(self, hashtag: str, moment: datetime) -> None:
+        if self.trending is not None:
+            await run_after_commit(
+                partial(self.trending.remove, hashtag, moment=moment)
+            )
+
+    async def bulk_create(
+        self, cmds: List[CreatePost], created_at: Optional[datetime] = None
+    ) -> List[dict]:
+        now = created_at or datetime.now()
+        results = [
+            {"index": index, "status": BulkItemStatus.conflict, "uuid": None}
+            for index in range(len(cmds))
+        ]
+        # profile_id уникален (см. PostAuthor), поэтому по нему же сопоставляем
+        # вставленные строки
+        pending: Dict[UUID, Tuple[int, dict]] = {}
+        for index, cmd in enumerate(cmds):
+            if cmd.profile_id in pending:
+                continue
+            row = cmd.model_dump()
+            row.update(
+                uuid=uuid4(), likes=cmd.likes or 0, created_at=now, updated_at=now
+            )
+            pending[cmd.profile_id] = (index, row)
+
+        async with self.transactional_session() as session:
+            existing = await session.execute(
+                select(Profile.uuid).where(Profile.uuid.in_(list(pending)))
+            )
+            existing_profiles = set(existing.scalars().all())
+            for profile_id in set(pending) - existing_profiles:
+                index, _ = pending.pop(profile_id)
+                results[index]["status"] = BulkItemStatus.profile_not_found
+
+            claimed = await self._claim_authors(session, pending)
+            rows = [
+                row for profile_id, (_, row) in pending.items() if profile_id in claimed
+            ]
+            if len(rows) >= self.copy_threshold:
+                inserted = await self._copy_insert(session, rows)
+            elif rows:
+                inserted = await self._multirow_insert(session, rows)
+            else:
+                inserted = []
+            await session.commit()
+
+        hashtags = []
+        for post_uuid, profile_id in inserted:
+            index, row = pending[profile_id]
+            results[index].update(status=BulkItemStatus.created, uuid=post_uuid)
+            hashtags.append(row["hashtag"])
+        await self._trend_add(*hashtags, moment=now)
+        return results
+
+    async def _claim_authors(
+        self, session: AsyncSession, pending: Dict[UUID, Tuple[int, dict]]
+    ) -> Set[UUID]:
+        # Строки post_authors занимаются заранее: профили, у которых пост уже
+        # есть, отсеиваются здесь, а триггер posts_claim_author их пропускает
+        if not pending:
+            return set()
+        stmt = (
+            pg_insert(PostAuthor)
+            .on_conflict_do_nothing()
+            .returning(PostAuthor.profile_id)
+        )
+        result = await session.execute(
+            stmt,
+            [
+                {"uuid": row["uuid"], "profile_id": profile_id}
+                for profile_id, (_, row) in pending.items()
+            ],
+        )
+        return set(result.scalars().all())
+
+    async def _multirow_insert(
+        self, session: AsyncSession, rows: List[dict]
+    ) -> List[Tuple[UUID, UUID]]:
+        stmt = (
+            pg_insert(self.model)
+            .on_conflict_do_nothing()
+            .returning(self.model.uuid, self.model.profile_id)
+        )
+        result = await session.execute(stmt, rows)
+        return result.tuples().all()
+
+    async def _copy_insert(
+        self, session: AsyncSession, rows: List[dict]
+    ) -> List[Tuple[UUID, UUID]]:
+        table = self.model.__tablename__
+        columns = list(rows[0])
+        column_list = ", ".join(columns)
+        await session.execute(
+            text(
+                f"CREATE TEMP TABLE {table}_bulk "
+                f"(LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP"
+            )
+        )
+        connection = await session.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            f"{table}_bulk",
+            records=[tuple(row[column] for column in columns) for row in rows],
+            columns=columns,
+        )
+        result = await session.execute(
+            text(
+                f"INSERT INTO {table} ({column_list}) "
+                f"SELECT {column_list} FROM {table}_bulk "
+                "ON CONFLICT DO NOTHING RETURNING uuid, profile_id"
+            )
+        )
+        return result.tuples().all()
+
     async def update(
         self,
         cmd: CreatePost,
         post_uuid: UUID,
     ) -> Optional[Post]:
         async with self.transactional_session() as session:
+            # Прежний хэштег читаем на мастере в той же транзакции: строка
+            # заблокирована до коммита, и реплика не вернет устаревшее значение
+            existing = await session.execute(
+                select(self.model.hashtag, self.model.created_at)
+                .where(self.model.uuid == post_uuid)
+                .with_for_update()
+            )
+            previous = existing.one_or_none()
             stmt = (
                 update(self.model)
                 .values(**cmd.model_dump())
@@ -86,6 +422,9 @@ class PostWriteRegistry(AbstractWriteRepository):
             result = await session.execute(stmt)
             await session.commit()
             answer = result.scalar_one_or_none()
+        if answer is not None and previous and previous.hashtag != answer.hashtag:
+            await self._trend_remove(previous.hashtag, moment=previous.created_at)
+            await self._trend_add(answer.hashtag, moment=previous.created_at)
         return answer
 
     async def delete(self, post_uuid: UUID) -> Optional[Post]:
@@ -98,17 +437,53 @@ class PostWriteRegistry(AbstractWriteRepository):
             result = await session.execute(stmt)
             await session.commit()
             answer = result.scalar_one_or_none()
+        if answer is not None:
+            await self._trend_remove(answer.hashtag, moment=answer.created_at)
         return answer
 
-    async def put_like(self, post_uuid: str | UUID, likes_count: int) -> Optional[dict]:
+    async def put_likes(
+        self, deltas: Dict[Union[UUID, str], int], batch_id: Optional[str] = None
+    ) -> int:
+        updated = 0
+        items = [(UUID(str(post_uuid)), delta) for post_uuid, delta in deltas.items()]
         async with self.transactional_session() as session:
-            stmt = (
-                update(self.model)
-                .where(self.model.uuid == post_uuid)
-                .values(likes=likes_count)
-                .returning(self.model.likes)
-            )
-            result = await session.execute(stmt)
+            if batch_id is not None and not await self._claim_likes_batch(
+                session, batch_id
+            ):
+                return 0
+            for start in range(0, len(items), self.likes_batch_size):
+                batch = values(
+                    column("uuid", SAUUID(as_uuid=True)),
+                    column("delta", Integer),
+                    name="v",
+                ).data(items[start : start + self.likes_batch_size])
+                stmt = (
+                    update(self.model)
+                    .where(self.model.uuid == batch.c.uuid)
+                    # Лайки не меняют пост: updated_at не трогаем, иначе
+                    # onupdate переставляет посты в выдаче по updated_at
+                    .values(
+                        likes=self.model.likes + batch.c.delta,
+                        updated_at=self.model.updated_at,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                result = await session.execute(stmt)
+                updated += result.rowcount
             await session.commit()
-            answer = result.mappings().first()
-        return answer
+        return updated
+
+    async def _claim_likes_batch(self, session: AsyncSession, batch_id: str) -> bool:
+        # Параллельный сброс той же пачки ждет здесь коммита первого и пропускает ее
+        claimed = await session.execute(
+            pg_insert(LikeBatch)
+            .values(uuid=UUID(batch_id))
+            .on_conflict_do_nothing()
+            .returning(LikeBatch.uuid)
+        )
+        await session.execute(
+            delete(LikeBatch).where(
+                LikeBatch.created_at < func.now() - self.likes_batch_retention
+            )
+        )
+        return claimed.scalar_one_or_none() is not None
@@ -1,10 +1,12 @@
 from datetime import datetime
-from typing import Optional
+from enum import Enum
+from typing import List, Optional
 from uuid import UUID
 
 from pydantic import BaseModel, field_validator
 
 from infrastructure.base_entities.base_filter import PatchedFilter
+from infrastructure.base_entities.base_pagination import CursorPage
 from infrastructure.database.models import Post
 
 
@@ -31,6 +33,42 @@ class PostReturnData(GetPostByUUID, CreatePost):
     updated_at: datetime
 
 
+class PostPage(CursorPage[PostReturnData]):
+    pass
+
+
+class PostSearchResult(PostReturnData):
+    rank: float
+    snippet: Optional[str] = None
+
+
+class PostSearchPage(CursorPage[PostSearchResult]):
+    pass
+
+
+class BulkItemStatus(str, Enum):
+    created = "created"
+    conflict = "conflict"
+    profile_not_found = "profile_not_found"
+
+
+class BulkPostResult(BaseModel):
+    index: int
+    status: BulkItemStatus
+    uuid: Optional[UUID] = None
+
+
+class BulkPostReturnData(BaseModel):
+    created: int
+    failed: int
+    items: List[BulkPostResult]
+
+
+class TrendingHashtag(BaseModel):
+    hashtag: str
+    score: float
+
+
 class ProfileFilter(PatchedFilter):
     uuid: Optional[UUID] = None
     header: Optional[str] = None
@@ -1,29 +1,65 @@
-from typing import Any, List, Optional, Union
+from functools import partial
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
 from uuid import UUID
 
 from asyncpg import UniqueViolationError
-from sqlalchemy import delete, insert, select, update
+from sqlalchemy import (
+    RowMapping,
+    Select,
+    any_,
+    bindparam,
+    delete,
+    insert,
+    select,
+    update,
+)
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import async_sessionmaker
 
-from domain.profile.schema import CreateProfile
+from domain.profile.schema import CreateProfile, ProfileFilter
 from infrastructure.base_entities.abs_repository import (
     AbstractReadRepository,
     AbstractWriteRepository,
 )
+from infrastructure.base_entities.base_pagination import KeysetPagination
+from infrastructure.base_entities.base_projection import SparseFieldset
+from infrastructure.cache.table_versions import TableVersions
 from infrastructure.database.alchemy_gateway import SessionManager
+from infrastructure.database.expressions import uuid_array
 from infrastructure.database.models import Friend, Profile
-from infrastructure.exceptions.profile_exceptions import ProfileAlreadyExists
+from infrastructure.database.unit_of_work import run_after_commit
+from infrastructure.exceptions.profile_exceptions import (
+    FriendAlreadyExist,
+    ProfileAlreadyExists,
+)
 
 
 class ProfileReadRegistry(AbstractReadRepository):
+    sortable_fields = ("created_at", "updated_at", "first_name", "last_name")
+
     def __init__(self, session_manager: SessionManager):
         super().__init__()
         self.model = Profile
+        self.pagination = KeysetPagination(
+            model=self.model, sortable_fields=self.sortable_fields
+        )
+        # Горячие запросы собираются один раз: ключ кеша компиляции запоминается
+        # в объекте, а одинаковый SQL переиспользует prepared statement asyncpg
+        self._get_stmt = select(self.model).filter(
+            self.model.uuid == bindparam("prof_uuid")
+        )
+        self._get_by_user_uuid_stmt = select(self.model).filter(
+            self.model.user_uuid == bindparam("user_uuid")
+        )
+        # Чтения уходят на реплики, см. SessionManager.choose_read_factory
         self.transactional_session: async_sessionmaker = (
-            session_manager.transactional_session
+            session_manager.read_session_factory
         )
         self.async_session_factory: async_sessionmaker = (
+            session_manager.read_session_factory
+        )
+        # Все, что кладется в кеш, читается с primary
+        self.primary_session_factory: async_sessionmaker = (
             session_manager.async_session_factory
         )
 
@@ -35,39 +71,135 @@ class ProfileReadRegistry(AbstractReadRepository):
 
     async def find(
         self,
-        filters: Any = None,
-    ) -> Union[list, select]:
-        query = select(self.model)
-        query = self.__set_filter(query, filters)
-        async with self.async_session_factory() as session:
+        filters: Optional[ProfileFilter] = None,
+        primary: bool = False,
+    ) -> Tuple[List[dict], Optional[str]]:
+        filters = filters or ProfileFilter()
+        query = self.__set_filter(filters.select(), filters)
+        query = filters.paginate(query)
+        factory = (
+            self.primary_session_factory if primary else self.async_session_factory
+        )
+        async with factory() as session:
             result = await session.execute(query)
-            return result.scalars().unique().all()
+            rows = result.mappings().all()
+        return filters.page(rows)
 
     async def get(self, prof_uuid: UUID) -> Optional[Profile]:
         async with self.transactional_session() as session:
-            stmt = select(self.model).filter(self.model.uuid == prof_uuid)
-            result = await session.execute(stmt)
+            result = await session.execute(self._get_stmt, {"prof_uuid": prof_uuid})
             answer = result.scalar_one_or_none()
         return answer
 
+    async def get_many(self, prof_uuids: Sequence[UUID]) -> List[Profile]:
+        if not prof_uuids:
+            return []
+        async with self.async_session_factory() as session:
+            stmt = select(self.model).filter(
+                self.model.uuid == any_(uuid_array("prof_uuids", prof_uuids))
+            )
+            result = await session.execute(stmt)
+            return result.scalars().all()
+
+    async def get_many_rows(
+        self, prof_uuids: Sequence[UUID], primary: bool = False
+    ) -> List[RowMapping]:
+        """
+        То же, что get_many, но без ORM: строки колонок таблицы.
+        primary=True читает с primary - так заполняется кеш, чтобы отставание
+        реплики не закрепилось в нем на ttl
+        """
+        if not prof_uuids:
+            return []
+        factory = (
+            self.primary_session_factory if primary else self.async_session_factory
+        )
+        async with factory() as session:
+            stmt = select(*self.model.__table__.columns).filter(
+                self.model.uuid == any_(uuid_array("prof_uuids", prof_uuids))
+            )
+            result = await session.execute(stmt)
+            return result.mappings().all()
+
     async def get_by_user_uuid(self, user_uuid: str) -> Optional[Profile]:
         async with self.transactional_session() as session:
-            stmt = select(self.model).filter(self.model.user_uuid == user_uuid)
-            result = await session.execute(stmt)
+            result = await session.execute(
+                self._get_by_user_uuid_stmt, {"user_uuid": user_uuid}
+            )
             answer = result.scalar_one_or_none()
         return answer
 
     async def get_list(
         self,
-        parameter: Any = "created_at",
-    ) -> Optional[List[Profile]]:
+        parameter: str = "created_at",
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        projection = SparseFieldset(model=self.model, fields=fields)
+        field_name, _ = self.pagination.parse_ordering(parameter)
+        stmt = self.pagination.paginate(
+            select(*projection.columns(field_name, self.pagination.tiebreaker)),
+            parameter=parameter,
+            limit=limit,
+            cursor=cursor,
+        )
+        async with self.async_session_factory() as session:
+            result = await session.execute(stmt)
+            rows = result.mappings().all()
+        items, next_cursor = self.pagination.page(
+            rows, parameter=parameter, limit=limit
+        )
+        return projection.project(items), next_cursor
+
+    def stream(
+        self,
+        fields: Optional[List[str]] = None,
+        chunk_size: int = 1000,
+    ) -> AsyncIterator[Sequence[RowMapping]]:
+        # Проекция проверяется сразу, до того как ответ начнет стримиться
+        projection = SparseFieldset(model=self.model, fields=fields)
+        stmt = select(*projection.columns()).execution_options(yield_per=chunk_size)
+        return self._stream(stmt)
+
+    async def _stream(self, stmt: Select) -> AsyncIterator[Sequence[RowMapping]]:
         async with self.async_session_factory() as session:
-            final = None
-            if option := getattr(self.model, parameter):
-                stmt = select(self.model).order_by(option)
-                result = await session.execute(stmt)
-                final = result.scalars().all()
-        return final
+            result = await session.stream(stmt)
+            async for partition in result.mappings().partitions():
+                yield partition
+
+    async def get_follower_ids(
+        self, profile_uuid: UUID, limit: Optional[int] = None
+    ) -> List[UUID]:
+        stmt = select(Friend.profile_id).where(Friend.friend_id == profile_uuid)
+        if limit:
+            stmt = stmt.limit(limit)
+        async with self.async_session_factory() as session:
+            result = await session.execute(stmt)
+            return result.scalars().all()
+
+    async def get_friend_ids(
+        self, profile_uuid: UUID, among: Optional[Sequence[UUID]] = None
+    ) -> List[UUID]:
+        stmt = select(Friend.friend_id).where(Friend.profile_id == profile_uuid)
+        if among is not None:
+            stmt = stmt.where(Friend.friend_id.in_(list(among)))
+        async with self.async_session_factory() as session:
+            result = await session.execute(stmt)
+            return result.scalars().all()
+
+    async def get_friend_ids_many(
+        self, profile_uuids: Sequence[UUID]
+    ) -> Dict[UUID, List[UUID]]:
+        adjacency = {profile_uuid: [] for profile_uuid in profile_uuids}
+        stmt = select(Friend.profile_id, Friend.friend_id).where(
+            Friend.profile_id.in_(list(profile_uuids))
+        )
+        async with self.async_session_factory() as session:
+            result = await session.execute(stmt)
+            for profile_uuid, friend_uuid in result.tuples():
+                adjacency.setdefault(profile_uuid, []).append(friend_uuid)
+        return adjacency
 
     async def check_existing_friend(
         self, profile_uuid: UUID, friend_uuid: UUID
@@ -83,9 +215,14 @@ class ProfileReadRegistry(AbstractReadRepository):
 
 
 class ProfileWriteRegistry(AbstractWriteRepository):
-    def __init__(self, session_manager: SessionManager):
+    def __init__(
+        self,
+        session_manager: SessionManager,
+        table_versions: Optional[TableVersions] = None,
+    ):
         super().__init__()
         self.model = Profile
+        self.table_versions = table_versions
         self.transactional_session: async_sessionmaker = (
             session_manager.transactional_session
         )
@@ -93,6 +230,11 @@ class ProfileWriteRegistry(AbstractWriteRepository):
             session_manager.async_session_factory
         )
 
+    async def _bump_version(self, *tables: str) -> None:
+        # Версия меняется после коммита, чтобы кеш не успел закрепить старые данные
+        if self.table_versions is not None:
+            await run_after_commit(partial(self.table_versions.bump, *tables))
+
     async def create(self, cmd: CreateProfile) -> Optional[Profile]:
         try:
             async with self.transactional_session() as session:
@@ -102,6 +244,7 @@ class ProfileWriteRegistry(AbstractWriteRepository):
                 result = await session.execute(stmt)
                 await session.commit()
                 answer = result.scalar_one_or_none()
+            await self._bump_version(self.model.__tablename__)
             return answer
         except (UniqueViolationError, IntegrityError):
             raise ProfileAlreadyExists
@@ -121,6 +264,7 @@ class ProfileWriteRegistry(AbstractWriteRepository):
             result = await session.execute(stmt)
             await session.commit()
             answer = result.scalar_one_or_none()
+        await self._bump_version(self.model.__tablename__)
         return answer
 
     async def delete(self, prof_uuid: UUID) -> Optional[Profile]:
@@ -133,14 +277,37 @@ class ProfileWriteRegistry(AbstractWriteRepository):
             result = await session.execute(stmt)
             await session.commit()
             answer = result.scalar_one_or_none()
+        await self._bump_version(self.model.__tablename__)
         return answer
 
     async def add_friend(self, profile_uuid: UUID, friend_uuid: UUID) -> Friend:
+        try:
+            async with self.transactional_session() as session:
+                stmt = (
+                    insert(Friend)
+                    .values(profile_id=profile_uuid, friend_id=friend_uuid)
+                    .returning(Friend)
+                )
+                result = await session.execute(stmt)
+                await session.commit()
+                answer = result.scalar_one_or_none()
+            await self._bump_version(Friend.__tablename__)
+            return answer
+        except (UniqueViolationError, IntegrityError):
+            raise FriendAlreadyExist
+
+    async def remove_friend(
+        self, profile_uuid: UUID, friend_uuid: UUID
+    ) -> Optional[Friend]:
         async with self.transactional_session() as session:
-            stmt = insert(Friend).values(
-                profile_uuid=profile_uuid, friend_uuid=friend_uuid
+            stmt = (
+                delete(Friend)
+                .where(Friend.profile_id == profile_uuid)
+                .where(Friend.friend_id == friend_uuid)
+                .returning(Friend)
             )
             result = await session.execute(stmt)
             await session.commit()
             answer = result.scalar_one_or_none()
+        await self._bump_version(Friend.__tablename__)
         return answer
@@ -5,6 +5,7 @@ from uuid import UUID
 from pydantic import BaseModel
 
 from infrastructure.base_entities.base_filter import PatchedFilter
+from infrastructure.base_entities.base_pagination import CursorPage
 from infrastructure.database.models import Profile
 
 
@@ -27,6 +28,35 @@ class ProfileReturnData(GetProfileByUUID, CreateProfile):
     updated_at: datetime
 
 
+class ProfilePartialData(BaseModel):
+    uuid: Optional[UUID] = None
+    user_uuid: Optional[str] = None
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    occupation: Optional[str] = None
+    status: Optional[str] = None
+    bio: Optional[str] = None
+    file_uuid: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class ProfilePage(CursorPage[ProfilePartialData]):
+    pass
+
+
+class FriendReturnData(BaseModel):
+    uuid: UUID
+    profile_id: UUID
+    friend_id: UUID
+    created_at: datetime
+
+
+class FriendSuggestion(BaseModel):
+    uuid: UUID
+    mutual_friends: int
+
+
 class ProfileFilter(PatchedFilter):
     uuid: Optional[UUID] = None
     user_uuid: Optional[str] = None
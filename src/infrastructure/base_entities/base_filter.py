@@ -1,7 +1,31 @@
+import hashlib
+from typing import Any, List, Optional, Sequence, Tuple
+
+import orjson
 from fastapi_filter.contrib.sqlalchemy import Filter
+from pydantic import Field, field_validator
+from sqlalchemy import Select, select
+
+from infrastructure.base_entities.base_pagination import KeysetPagination
+from infrastructure.base_entities.base_projection import SparseFieldset
 
 
 class PatchedFilter(Filter):
+    limit: Optional[int] = Field(default=None, ge=1)
+    cursor: Optional[str] = None
+    fields: Optional[List[str]] = None
+
+    class Constants(Filter.Constants):
+        pagination_fields: Tuple[str, ...] = ("limit", "cursor", "fields")
+        pagination_parameter: str = "created_at"
+        sortable_fields: Tuple[str, ...] = ("created_at",)
+
+    @field_validator("fields", mode="before")
+    def split_fields(cls, value):
+        if isinstance(value, str):
+            return [field.strip() for field in value.split(",") if field.strip()]
+        return value
+
     def sort(self, query):
         for field_name, _ in self.filtering_fields:
             field_value = getattr(self, field_name)
@@ -13,4 +37,48 @@ class PatchedFilter(Filter):
     def filtering_fields(self):
         fields = self.model_dump(exclude_none=True)
         fields.pop(self.Constants.ordering_field_name, None)
+        for field_name in self.Constants.pagination_fields:
+            fields.pop(field_name, None)
         return fields.items()
+
+    @property
+    def pagination(self) -> KeysetPagination:
+        return KeysetPagination(
+            model=self.Constants.model,
+            sortable_fields=self.Constants.sortable_fields,
+        )
+
+    @property
+    def projection(self) -> SparseFieldset:
+        return SparseFieldset(model=self.Constants.model, fields=self.fields)
+
+    def cache_key(self) -> str:
+        """
+        Канонический отпечаток фильтра, сортировки и пагинации для ключа кеша
+        """
+        data = self.model_dump(mode="json", exclude_none=True)
+        if "fields" in data:
+            data["fields"] = sorted(set(data["fields"]))
+        payload = orjson.dumps(
+            [self.Constants.model.__tablename__, data], option=orjson.OPT_SORT_KEYS
+        )
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+    def select(self) -> Select:
+        pagination = self.pagination
+        field_name, _ = pagination.parse_ordering(self.Constants.pagination_parameter)
+        return select(*self.projection.columns(field_name, pagination.tiebreaker))
+
+    def paginate(self, query: Select) -> Select:
+        return self.pagination.paginate(
+            query,
+            parameter=self.Constants.pagination_parameter,
+            limit=self.limit,
+            cursor=self.cursor,
+        )
+
+    def page(self, rows: Sequence[Any]) -> Tuple[List[dict], Optional[str]]:
+        items, next_cursor = self.pagination.page(
+            rows, parameter=self.Constants.pagination_parameter, limit=self.limit
+        )
+        return self.projection.project(items), next_cursor
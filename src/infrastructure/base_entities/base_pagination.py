@@ -0,0 +1,140 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections.abc import Mapping
+from typing import Any, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+import orjson
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from sqlalchemy import Select, tuple_
+
+from infrastructure.exceptions.pagination_exceptions import (
+    InvalidCursor,
+    UnsupportedSortField,
+)
+
+item_type = TypeVar("item_type")
+
+
+class CursorPage(BaseModel, Generic[item_type]):
+    """
+    Страница keyset-пагинации
+    """
+
+    items: List[item_type]
+    next_cursor: Optional[str] = None
+
+
+class KeysetPagination:
+    """
+    Keyset-пагинация по (колонка сортировки, uuid) с непрозрачным курсором
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        sortable_fields: Sequence[str],
+        tiebreaker: str = "uuid",
+        default_limit: int = 50,
+        max_limit: int = 500,
+    ) -> None:
+        self.model = model
+        self.sortable_fields = tuple(sortable_fields)
+        self.tiebreaker = tiebreaker
+        self.default_limit = default_limit
+        self.max_limit = max_limit
+
+    def parse_ordering(self, parameter: str) -> Tuple[str, bool]:
+        descending = parameter.startswith("-")
+        field_name = parameter.lstrip("+-")
+        if field_name not in self.sortable_fields:
+            raise UnsupportedSortField(
+                message=f"Sorting by {field_name!r} is not supported, "
+                f"available: {', '.join(self.sortable_fields)}"
+            )
+        return field_name, descending
+
+    def clamp_limit(self, limit: Optional[int]) -> int:
+        if not limit or limit < 1:
+            return self.default_limit
+        return min(limit, self.max_limit)
+
+    def paginate(
+        self,
+        query: Select,
+        parameter: str = "created_at",
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> Select:
+        field_name, descending = self.parse_ordering(parameter)
+        sort_column = getattr(self.model, field_name)
+        tiebreaker = getattr(self.model, self.tiebreaker)
+        if cursor:
+            value, last_uuid = self.decode_cursor(cursor, parameter)
+            keyset = tuple_(sort_column, tiebreaker)
+            bound = tuple_(value, last_uuid)
+            query = query.where(keyset < bound if descending else keyset > bound)
+            # Дублирующее условие по одной колонке: сравнение кортежей не
+            # используется для отсечения секций и границ индекса по колонке
+            query = query.where(
+                sort_column <= value if descending else sort_column >= value
+            )
+        if descending:
+            query = query.order_by(sort_column.desc(), tiebreaker.desc())
+        else:
+            query = query.order_by(sort_column.asc(), tiebreaker.asc())
+        # Лишняя строка нужна только для того, чтобы понять, есть ли следующая страница
+        return query.limit(self.clamp_limit(limit) + 1)
+
+    def page(
+        self,
+        rows: Sequence[Any],
+        parameter: str = "created_at",
+        limit: Optional[int] = None,
+    ) -> Tuple[List[Any], Optional[str]]:
+        limit = self.clamp_limit(limit)
+        items = list(rows[:limit])
+        if len(rows) <= limit or not items:
+            return items, None
+        field_name, _ = self.parse_ordering(parameter)
+        return items, self.encode_cursor(
+            parameter=parameter,
+            value=self._read(items[-1], field_name),
+            last_uuid=self._read(items[-1], self.tiebreaker),
+        )
+
+    @staticmethod
+    def _read(row: Any, field_name: str) -> Any:
+        if isinstance(row, Mapping):
+            return row[field_name]
+        if hasattr(row, "_mapping"):
+            return row._mapping[field_name]
+        return getattr(row, field_name)
+
+    @staticmethod
+    def encode_cursor(parameter: str, value: Any, last_uuid: Any) -> str:
+        payload = orjson.dumps({"s": parameter, "v": value, "u": last_uuid})
+        return urlsafe_b64encode(payload).rstrip(b"=").decode()
+
+    @staticmethod
+    def load_cursor(cursor: str, parameter: str) -> Tuple[Any, Any]:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            payload = orjson.loads(urlsafe_b64decode(padded))
+            if payload["s"] != parameter:
+                raise InvalidCursor
+            return payload["v"], payload["u"]
+        except (ValueError, TypeError, KeyError):
+            raise InvalidCursor
+
+    def decode_cursor(self, cursor: str, parameter: str) -> Tuple[Any, Any]:
+        field_name, _ = self.parse_ordering(parameter)
+        value, last_uuid = self.load_cursor(cursor, parameter)
+        try:
+            value = self._python_value(field_name, value)
+            last_uuid = self._python_value(self.tiebreaker, last_uuid)
+        except ValidationError:
+            raise InvalidCursor
+        return value, last_uuid
+
+    def _python_value(self, field_name: str, raw: Any) -> Any:
+        python_type = getattr(self.model, field_name).type.python_type
+        return TypeAdapter(python_type).validate_python(raw)
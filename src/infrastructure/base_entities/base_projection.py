@@ -0,0 +1,26 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+from infrastructure.exceptions.pagination_exceptions import UnsupportedProjectionField
+
+
+class SparseFieldset:
+    """
+    Проекция колонок модели для параметра fields=
+    """
+
+    def __init__(self, model: Any, fields: Optional[Sequence[str]] = None) -> None:
+        self.model = model
+        available = self.model.__table__.columns.keys()
+        self.fields = list(dict.fromkeys(fields)) if fields else list(available)
+        if unknown := [name for name in self.fields if name not in available]:
+            raise UnsupportedProjectionField(
+                message=f"Unknown fields: {', '.join(unknown)}, "
+                f"available: {', '.join(available)}"
+            )
+
+    def columns(self, *required: str) -> list:
+        names = dict.fromkeys([*self.fields, *required])
+        return [getattr(self.model, name) for name in names]
+
+    def project(self, rows: Sequence[Any]) -> List[Dict[str, Any]]:
+        return [{name: row[name] for name in self.fields} for row in rows]
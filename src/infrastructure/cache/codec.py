@@ -0,0 +1,169 @@
+import logging
+import struct
+import zlib
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple, Type, get_args
+from uuid import UUID
+
+import orjson
+from pydantic import BaseModel
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+
+class CacheCodecError(ValueError):
+    pass
+
+
+# Типы, которые orjson пишет строками и которые нужно вернуть при чтении
+converters: Dict[type, Callable[[Any], Any]] = {
+    UUID: UUID,
+    datetime: datetime.fromisoformat,
+}
+
+
+def _converter(annotation: Any) -> Optional[Callable[[Any], Any]]:
+    for candidate in (annotation, *get_args(annotation)):
+        if candidate in converters:
+            return converters[candidate]
+    return None
+
+
+class CacheCodec:
+    """
+    Бинарный формат значений кеша:
+    заголовок (версия, сжатие, схема, отпечаток полей, fresh_until) + тело.
+    Модели зарегистрированных схем хранятся списком значений без имен полей
+    """
+
+    version = 1
+    header = struct.Struct("!BBBHd")
+    json_schema = 0
+    none_schema = 255
+    compressions = ("none", "zlib", "zstd", "lz4")
+
+    def __init__(
+        self,
+        schemas: Optional[Dict[int, Type[BaseModel]]] = None,
+        compression: Optional[str] = "zlib",
+        compress_threshold: int = 512,
+        level: int = 3,
+        logger: logging.Logger = logging,
+    ) -> None:
+        self.schemas = dict(schemas or {})
+        self.schema_ids = {
+            schema: schema_id for schema_id, schema in self.schemas.items()
+        }
+        self.fields = {
+            schema_id: tuple(schema.model_fields)
+            for schema_id, schema in self.schemas.items()
+        }
+        self.converters = {
+            schema_id: tuple(
+                _converter(field.annotation) for field in schema.model_fields.values()
+            )
+            for schema_id, schema in self.schemas.items()
+        }
+        self.fingerprints = {
+            schema_id: zlib.crc32(",".join(fields).encode()) & 0xFFFF
+            for schema_id, fields in self.fields.items()
+        }
+        self.compress_threshold = compress_threshold
+        self.compressors, self.decompressors = self._codecs(level)
+        if compression and compression not in self.compressors:
+            logger.warning(f"Сжатие {compression!r} недоступно, используется zlib")
+            compression = "zlib"
+        self.compression = self.compressions.index(compression or "none")
+
+    @staticmethod
+    def _codecs(level: int) -> Tuple[Dict[str, Callable], Dict[int, Callable]]:
+        compressors = {"zlib": lambda data: zlib.compress(data, level)}
+        decompressors = {1: zlib.decompress}
+        if zstandard is not None:
+            compressors["zstd"] = zstandard.ZstdCompressor(level=level).compress
+            decompressors[2] = zstandard.ZstdDecompressor().decompress
+        if lz4_frame is not None:
+            compressors["lz4"] = lz4_frame.compress
+            decompressors[3] = lz4_frame.decompress
+        return compressors, decompressors
+
+    def dumps(self, value: Any, fresh_until: float = 0) -> bytes:
+        schema_id = self.schema_ids.get(type(value), self.json_schema)
+        if value is None:
+            schema_id, body = self.none_schema, b""
+        elif schema_id != self.json_schema:
+            body = orjson.dumps(
+                [getattr(value, field) for field in self.fields[schema_id]]
+            )
+        else:
+            body = orjson.dumps(value, default=self._default)
+
+        compression = 0
+        if self.compression and len(body) >= self.compress_threshold:
+            compressed = self.compressors[self.compressions[self.compression]](body)
+            if len(compressed) < len(body):
+                compression, body = self.compression, compressed
+        fingerprint = self.fingerprints.get(schema_id, 0)
+        return (
+            self.header.pack(
+                self.version, compression, schema_id, fingerprint, fresh_until
+            )
+            + body
+        )
+
+    @staticmethod
+    def _default(value: Any) -> Any:
+        if isinstance(value, BaseModel):
+            return value.model_dump(mode="json")
+        raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+    def loads(self, raw: bytes) -> Any:
+        return self.loads_entry(raw)[0]
+
+    def loads_entry(self, raw: bytes) -> Tuple[Any, float]:
+        """
+        Раскодировать значение и момент, до которого оно считается свежим
+        """
+        try:
+            version, compression, schema_id, fingerprint, fresh_until = (
+                self.header.unpack_from(raw)
+            )
+        except struct.error as error:
+            raise CacheCodecError(f"Некорректный заголовок: {error}")
+        if version != self.version:
+            raise CacheCodecError(f"Неизвестная версия формата {version}")
+        if schema_id == self.none_schema:
+            return None, fresh_until
+        if schema_id != self.json_schema and schema_id not in self.schemas:
+            raise CacheCodecError(f"Неизвестная схема {schema_id}")
+        if fingerprint != self.fingerprints.get(schema_id, 0):
+            raise CacheCodecError(f"Схема {schema_id} изменилась")
+
+        body = raw[self.header.size :]
+        if compression:
+            if (decompress := self.decompressors.get(compression)) is None:
+                raise CacheCodecError(f"Сжатие {compression} недоступно")
+            try:
+                body = decompress(body)
+            except Exception as error:
+                raise CacheCodecError(f"Ошибка распаковки: {error}")
+        data = orjson.loads(body)
+        if schema_id == self.json_schema:
+            return data, fresh_until
+        # Значение проверено схемой до записи в кеш: повторная валидация
+        # лишняя и отбрасывает строки, не проходящие валидаторы схемы записи
+        values = {
+            field: value if convert is None or value is None else convert(value)
+            for field, value, convert in zip(
+                self.fields[schema_id], data, self.converters[schema_id]
+            )
+        }
+        return self.schemas[schema_id].model_construct(**values), fresh_until
@@ -0,0 +1,103 @@
+import logging
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set
+from uuid import UUID
+
+from redis.asyncio import Redis
+
+from infrastructure.handlers.asyncio_handlers import run_with_timeout
+
+
+class FriendGraphCache:
+    """
+    Списки смежности графа друзей в set Redis.
+    Set считается загруженным из БД только если в нем есть служебный элемент.
+    """
+
+    loaded_marker = "__loaded__"
+
+    def __init__(
+        self,
+        redis: Redis,
+        prefix: str = "friends",
+        ttl: int = 24 * 60 * 60,
+        timeout: float = 0.1,
+        logger: logging.Logger = logging,
+    ) -> None:
+        self.redis = redis
+        self.prefix = prefix
+        self.ttl = ttl
+        self.timeout = timeout
+        self.logger = logger
+
+    def _key(self, profile_uuid: UUID | str) -> str:
+        return f"{self.prefix}:{profile_uuid}"
+
+    async def _run(self, coro, operation_name: str):
+        return await run_with_timeout(
+            coro,
+            timeout=self.timeout,
+            operation_name=f"FriendGraphCache {operation_name}",
+            logger=self.logger,
+        )
+
+    def _members(self, raw: Iterable[str]) -> Set[UUID]:
+        return {UUID(member) for member in raw if member != self.loaded_marker}
+
+    async def ensure(
+        self,
+        profile_uuids: List[UUID],
+        loader: Callable[[List[UUID]], Awaitable[Dict[UUID, List[UUID]]]],
+    ) -> bool:
+        pipeline = self.redis.pipeline(transaction=False)
+        for profile_uuid in profile_uuids:
+            pipeline.sismember(self._key(profile_uuid), self.loaded_marker)
+        if (flags := await self._run(pipeline.execute(), "Check")) is None:
+            return False
+        if missing := [uuid for uuid, flag in zip(profile_uuids, flags) if not flag]:
+            adjacency = await loader(missing)
+            pipeline = self.redis.pipeline(transaction=False)
+            for profile_uuid in missing:
+                friends = [str(friend) for friend in adjacency.get(profile_uuid, [])]
+                key = self._key(profile_uuid)
+                pipeline.sadd(key, self.loaded_marker, *friends)
+                pipeline.expire(key, self.ttl)
+            if await self._run(pipeline.execute(), "Load") is None:
+                return False
+        return True
+
+    async def is_member(self, profile_uuid: UUID, friend_uuid: UUID) -> Optional[bool]:
+        result = await self._run(
+            self.redis.sismember(self._key(profile_uuid), str(friend_uuid)), "Member"
+        )
+        return None if result is None else bool(result)
+
+    async def intersect(self, *profile_uuids: UUID) -> Optional[Set[UUID]]:
+        keys = [self._key(profile_uuid) for profile_uuid in profile_uuids]
+        result = await self._run(self.redis.sinter(keys), "Intersect")
+        return None if result is None else self._members(result)
+
+    async def members_many(
+        self, profile_uuids: List[UUID]
+    ) -> Optional[Dict[UUID, Set[UUID]]]:
+        pipeline = self.redis.pipeline(transaction=False)
+        for profile_uuid in profile_uuids:
+            pipeline.smembers(self._key(profile_uuid))
+        if (result := await self._run(pipeline.execute(), "Members")) is None:
+            return None
+        return {
+            profile_uuid: self._members(members)
+            for profile_uuid, members in zip(profile_uuids, result)
+        }
+
+    async def add(self, profile_uuid: UUID, friend_uuid: UUID) -> None:
+        # Незагруженный set без маркера будет дочитан из БД при следующем ensure
+        key = self._key(profile_uuid)
+        pipeline = self.redis.pipeline(transaction=False)
+        pipeline.sadd(key, str(friend_uuid))
+        pipeline.expire(key, self.ttl)
+        await self._run(pipeline.execute(), "Add")
+
+    async def remove(self, profile_uuid: UUID, friend_uuid: UUID) -> None:
+        await self._run(
+            self.redis.srem(self._key(profile_uuid), str(friend_uuid)), "Remove"
+        )
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Sequence
+
+from redis.asyncio import Redis
+
+from infrastructure.handlers.asyncio_handlers import fire_and_forget, run_with_timeout
+
+
+class HotKeys:
+    """
+    Недавно запрошенные ключи вида "<вид>:<id>" в sorted set со временем обращения.
+    Обращения копятся в памяти и записываются в redis пачкой раз в flush_interval,
+    учитываются только виды из kinds, которые умеет загружать прогрев
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        key: str = "cache:hot",
+        max_size: int = 100_000,
+        flush_interval: float = 5,
+        timeout: float = 0.5,
+        kinds: Optional[Sequence[str]] = None,
+        logger: logging.Logger = logging,
+    ) -> None:
+        self.redis = redis
+        self.key = key
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.kinds = set(kinds) if kinds else None
+        self.logger = logger
+        self._touched: Dict[str, float] = {}
+        self._flusher: Optional[asyncio.Task] = None
+
+    def touch(self, *members: str) -> None:
+        now = time.time()
+        for member in members:
+            if self.kinds is None or member.partition(":")[0] in self.kinds:
+                self._touched[member] = now
+
+    async def flush(self) -> None:
+        if not self._touched:
+            return
+        touched, self._touched = self._touched, {}
+        pipeline = self.redis.pipeline(transaction=False)
+        pipeline.zadd(self.key, touched)
+        # Оставляем только max_size самых свежих обращений
+        pipeline.zremrangebyrank(self.key, 0, -self.max_size - 1)
+        await run_with_timeout(
+            pipeline.execute(),
+            timeout=self.timeout,
+            operation_name="HotKeys Flush",
+            logger=self.logger,
+        )
+
+    async def top(self, limit: int) -> List[str]:
+        members = await run_with_timeout(
+            self.redis.zrevrange(self.key, 0, limit - 1),
+            timeout=self.timeout,
+            operation_name="HotKeys Top",
+            logger=self.logger,
+        )
+        return members or []
+
+    async def start(self) -> None:
+        if self._flusher is None:
+            self._flusher = fire_and_forget(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as error:
+                self.logger.error(f"Ошибка записи горячих ключей: {error}")
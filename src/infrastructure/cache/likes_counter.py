@@ -0,0 +1,67 @@
+from typing import Dict, NamedTuple, Optional
+from uuid import UUID, uuid4
+
+from redis.asyncio import Redis
+
+
+class LikesBatch(NamedTuple):
+    # id пачки: повторная отправка той же пачки в БД не применяется дважды
+    batch_id: Optional[str]
+    deltas: Dict[str, int]
+
+
+class LikesCounter:
+    """
+    Write-behind счетчик лайков: дельты копятся в hash Redis и сбрасываются в БД пачкой
+    """
+
+    # Недосброшенная в прошлый раз пачка отдается повторно с тем же id,
+    # иначе накопленные дельты атомарно становятся новой пачкой
+    _drain_script = (
+        "if redis.call('exists', KEYS[2]) == 0 then "
+        "if redis.call('exists', KEYS[1]) == 0 then return {false, {}} end "
+        "redis.call('rename', KEYS[1], KEYS[2]) "
+        "redis.call('set', KEYS[3], ARGV[1]) end "
+        "local batch = redis.call('get', KEYS[3]) "
+        "if not batch then batch = ARGV[1] redis.call('set', KEYS[3], batch) end "
+        "return {batch, redis.call('hgetall', KEYS[2])}"
+    )
+    # Пачка удаляется, только если это все еще она, а не следующая
+    _ack_script = (
+        "if redis.call('get', KEYS[2]) == ARGV[1] then "
+        "return redis.call('del', KEYS[1], KEYS[2]) else return 0 end"
+    )
+
+    def __init__(
+        self,
+        redis: Redis,
+        pending_key: str = "post:likes:pending",
+        flushing_key: str = "post:likes:flushing",
+        batch_key: str = "post:likes:flushing:batch",
+    ) -> None:
+        self.redis = redis
+        self.pending_key = pending_key
+        self.flushing_key = flushing_key
+        self.batch_key = batch_key
+
+    async def incr(self, post_uuid: UUID | str, amount: int = 1) -> int:
+        return await self.redis.hincrby(self.pending_key, str(post_uuid), amount)
+
+    async def drain(self) -> LikesBatch:
+        batch_id, pairs = await self.redis.eval(
+            self._drain_script,
+            3,
+            self.pending_key,
+            self.flushing_key,
+            self.batch_key,
+            str(uuid4()),
+        )
+        deltas = {
+            post_uuid: int(delta) for post_uuid, delta in zip(pairs[::2], pairs[1::2])
+        }
+        return LikesBatch(batch_id=batch_id, deltas=deltas)
+
+    async def ack(self, batch_id: str) -> None:
+        await self.redis.eval(
+            self._ack_script, 2, self.flushing_key, self.batch_key, batch_id
+        )
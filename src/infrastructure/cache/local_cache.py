@@ -0,0 +1,60 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+# Отличает отсутствие записи от закешированного None
+MISSING = object()
+
+
+class LocalCache:
+    """
+    In-process LRU кеш с TTL на запись, ограниченный числом записей и объемом в байтах
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl: float = 5,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size_bytes = 0
+        self._entries: OrderedDict[Hashable, Tuple[float, int, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        expires_at, _, value = entry
+        if expires_at <= time.monotonic():
+            self.delete(key)
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def set(
+        self, key: Hashable, value: Any, size: int, ttl: Optional[float] = None
+    ) -> None:
+        if size > self.max_bytes:
+            return
+        self.delete(key)
+        ttl = min(ttl, self.ttl) if ttl else self.ttl
+        self._entries[key] = (time.monotonic() + ttl, size, value)
+        self.size_bytes += size
+        while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self.size_bytes -= evicted_size
+
+    def delete(self, *keys: Hashable) -> None:
+        for key in keys:
+            if (entry := self._entries.pop(key, None)) is not None:
+                self.size_bytes -= entry[1]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size_bytes = 0
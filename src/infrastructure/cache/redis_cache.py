@@ -1,110 +1,610 @@
 import asyncio
 import functools
+import hashlib
 import logging
+import math
+import time
 from datetime import timedelta
-from typing import Any, overload
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    overload,
+)
+from uuid import uuid4
 
 import orjson
 from redis.asyncio import Redis
 
-from infrastructure.handlers.asyncio_handlers import run_with_timeout
+from infrastructure.cache.codec import CacheCodec, CacheCodecError
+from infrastructure.cache.hot_keys import HotKeys
+from infrastructure.cache.local_cache import MISSING, LocalCache
+from infrastructure.handlers.asyncio_handlers import fire_and_forget, run_with_timeout
+from infrastructure.handlers.circuit_breaker import CircuitBreaker
 
 
 class RedisCache:
+    lock_poll_interval: float = 0.05
+    _release_script = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then "
+        "return redis.call('del', KEYS[1]) else return 0 end"
+    )
+
     def __init__(
         self,
         redis: Redis,
         loop: asyncio.AbstractEventLoop = asyncio.get_event_loop(),
         logger: logging.Logger = logging,
-        serializer=orjson,
+        serializer: CacheCodec = CacheCodec(),
+        local_cache: Optional[LocalCache] = None,
+        invalidation_channel: str = "cache:invalidate",
+        reconnect_delay: float = 1,
+        namespace: str = "cache",
+        version: int = 1,
+        breaker: Optional[CircuitBreaker] = None,
+        hot_keys: Optional[HotKeys] = None,
+        negative_ttl: float = 0,
     ) -> None:
         self.redis = redis
         self.loop = loop
         self.logger = logger
         self.serializer = serializer
+        self.local_cache = local_cache
+        self.invalidation_channel = invalidation_channel
+        self.reconnect_delay = reconnect_delay
+        self.namespace = namespace
+        self.version = version
+        self.key_prefix = f"{namespace}:v{version}"
+        self.breaker = breaker
+        self.hot_keys = hot_keys
+        # Общая политика для отсутствующих объектов: cache и cache_many пишут
+        # одни и те же ключи и должны одинаково помнить промахи
+        self.negative_ttl = negative_ttl
+        self.counters = dict.fromkeys(
+            ("l1_hits", "l1_misses", "l2_hits", "l2_misses"), 0
+        )
+        self._listener: Optional[asyncio.Task] = None
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Счетчики попаданий по уровням кеша, текущий размер L1 и состояние размыкателя
+        """
+        stats = dict(self.counters)
+        if self.local_cache is not None:
+            stats["l1_entries"] = len(self.local_cache)
+            stats["l1_bytes"] = self.local_cache.size_bytes
+        if self.breaker is not None:
+            stats["breaker"] = self.breaker.metrics()
+        return stats
+
+    def _local_get(self, key: str) -> Any:
+        if self.local_cache is None:
+            return MISSING
+        entry = self.local_cache.get(key)
+        self.counters["l1_misses" if entry is MISSING else "l1_hits"] += 1
+        return entry
+
+    def _local_set(
+        self, key: str, entry: Tuple[Any, float], raw: bytes, expire
+    ) -> None:
+        if self.local_cache is None:
+            return
+        if isinstance(expire, timedelta):
+            expire = expire.total_seconds()
+        self.local_cache.set(key, entry, size=len(raw), ttl=expire)
+
+    def _decode(self, key: str, raw: Optional[bytes]) -> Any:
+        self.counters["l2_hits" if raw else "l2_misses"] += 1
+        if not raw:
+            return MISSING
+        try:
+            entry = self.serializer.loads_entry(raw)
+        except (CacheCodecError, ValueError) as error:
+            self.logger.warning(f"Не удалось раскодировать ключ {key!r}: {error}")
+            return MISSING
+        self._local_set(key, entry, raw, expire=None)
+        return entry
 
     async def set(
-        self, key: str, value: Any, timeout: int | float, expire: int | timedelta
+        self,
+        key: str,
+        value: Any,
+        timeout: int | float,
+        expire: int | timedelta,
+        fresh_until: float = 0,
     ) -> None:
-        func = self.redis.set(key, self.serializer.dumps(value), ex=expire)
+        """
+        Записать значение, None сохраняется как отрицательный кеш
+        """
+        raw = self.serializer.dumps(value, fresh_until=fresh_until)
+        self._local_set(key, (value, fresh_until), raw, expire)
+        func = self.redis.set(key, raw, ex=expire)
         await run_with_timeout(
-            func, timeout=timeout, operation_name="RedisCache Set", logger=self.logger
+            func,
+            timeout=timeout,
+            operation_name="RedisCache Set",
+            logger=self.logger,
+            breaker=self.breaker,
         )
 
-    async def get(self, key, timeout) -> Any:
+    async def get(self, key, timeout, default: Any = None) -> Any:
+        """
+        Прочитать значение: None - закешированное отсутствие объекта,
+        default - ключа нет в кеше
+        """
+        entry = await self._get_entry(key, timeout)
+        return default if entry is MISSING else entry[0]
+
+    async def _get_entry(self, key: str, timeout) -> Any:
+        if (entry := self._local_get(key)) is not MISSING:
+            return entry
         result = await run_with_timeout(
             self.redis.get(key),
             timeout=timeout,
             operation_name="RedisCache Get",
             logger=self.logger,
+            breaker=self.breaker,
+        )
+        return self._decode(key, result)
+
+    async def get_many(
+        self, keys: Sequence[str], timeout, default: Any = None
+    ) -> List[Any]:
+        entries = [self._local_get(key) for key in keys]
+        remote_keys = [key for key, entry in zip(keys, entries) if entry is MISSING]
+        if remote_keys:
+            result = await run_with_timeout(
+                self.redis.mget(remote_keys),
+                timeout=timeout,
+                operation_name="RedisCache MGet",
+                logger=self.logger,
+                breaker=self.breaker,
+            )
+            remote = {
+                key: self._decode(key, raw)
+                for key, raw in zip(remote_keys, result or [None] * len(remote_keys))
+            }
+            entries = [
+                remote[key] if entry is MISSING else entry
+                for key, entry in zip(keys, entries)
+            ]
+        return [default if entry is MISSING else entry[0] for entry in entries]
+
+    async def set_many(
+        self, mapping: Dict[str, Any], timeout: int | float, expire: int | timedelta
+    ) -> None:
+        pipeline = self.redis.pipeline(transaction=False)
+        for key, value in mapping.items():
+            raw = self.serializer.dumps(value)
+            self._local_set(key, (value, 0), raw, expire)
+            pipeline.set(key, raw, ex=expire)
+        await run_with_timeout(
+            pipeline.execute(),
+            timeout=timeout,
+            operation_name="RedisCache Set Many",
+            logger=self.logger,
+            breaker=self.breaker,
+        )
+
+    async def invalidate(self, *keys: str, timeout: int | float = 0.07) -> None:
+        """
+        Удалить ключи из redis и из L1 всех воркеров через pub/sub.
+        Размыкатель инвалидацию не блокирует, иначе кеш останется устаревшим
+        """
+        if not keys:
+            return
+        if self.local_cache is not None:
+            self.local_cache.delete(*keys)
+        pipeline = self.redis.pipeline(transaction=False)
+        pipeline.delete(*keys)
+        pipeline.publish(self.invalidation_channel, self.serializer.dumps(list(keys)))
+        await run_with_timeout(
+            pipeline.execute(),
+            timeout=timeout,
+            operation_name="RedisCache Invalidate",
+            logger=self.logger,
         )
-        return self.serializer.loads(result) if result else None
+
+    async def invalidate_tags(self, *tags: str, timeout: int | float = 0.07) -> None:
+        """
+        Удалить все записи, зарегистрированные под тегами
+        """
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        if not tag_keys:
+            return
+        pipeline = self.redis.pipeline(transaction=False)
+        for tag_key in tag_keys:
+            pipeline.smembers(tag_key)
+        members = await run_with_timeout(
+            pipeline.execute(),
+            timeout=timeout,
+            operation_name="RedisCache Tag Members",
+            logger=self.logger,
+        )
+        keys = {
+            key.decode() if isinstance(key, bytes) else key
+            for tagged in members or ()
+            for key in tagged
+        }
+        await self.invalidate(*keys, *tag_keys, timeout=timeout)
+
+    async def _register_tags(
+        self,
+        tagged: Dict[str, Sequence[str]],
+        timeout: int | float,
+        expire: int | timedelta,
+    ) -> None:
+        pipeline = self.redis.pipeline(transaction=False)
+        for key, tags in tagged.items():
+            for tag in tags:
+                pipeline.sadd(self._tag_key(tag), key)
+                pipeline.expire(self._tag_key(tag), expire)
+        if not pipeline.command_stack:
+            return
+        await run_with_timeout(
+            pipeline.execute(),
+            timeout=timeout,
+            operation_name="RedisCache Tag",
+            logger=self.logger,
+            breaker=self.breaker,
+        )
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.namespace}:tag:{tag}"
+
+    async def listen_invalidations(self) -> None:
+        """
+        Запустить фоновую подписку на сообщения об инвалидации L1
+        """
+        if self.local_cache is None or self._listener is not None:
+            return
+        self._listener = fire_and_forget(self._listen())
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self.invalidation_channel)
+                    # Пока не были подписаны, могли пропустить инвалидации
+                    self.local_cache.clear()
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        self.local_cache.delete(*self.serializer.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                self.logger.error(f"Подписка на инвалидацию кеша прервана: {error}")
+                self.local_cache.clear()
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def cache_many(
+        self,
+        func: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]],
+        ids: Sequence[Hashable],
+        prefix: str,
+        ttl: float = 60,
+        timeout: float = 0.07,
+        negative_ttl: Optional[float] = None,
+        track: bool = True,
+    ) -> Dict[Hashable, Any]:
+        """
+        Кешировать пачку объектов: один MGET, загрузка промахов одним вызовом func
+        :param func: загрузчик промахов, возвращает {id: значение}
+        :param ids: идентификаторы объектов
+        :param prefix: префикс ключей кеша, запись регистрируется под тегом
+            "<prefix>:<id>"
+        :param ttl: время жизни кеша в секундах
+        :param timeout: время ожидания ответа от redis в секундах
+        :param negative_ttl: сколько секунд помнить, что объекта нет,
+            0 - не кешировать отсутствие, по умолчанию - negative_ttl кеша
+        :param track: учитывать обращения в горячих ключах; прогрев кеша
+            передает False, чтобы не поддерживать горячими сами прогреваемые ключи
+        """
+        if negative_ttl is None:
+            negative_ttl = self.negative_ttl
+        ids = list(dict.fromkeys(ids))
+        if track and self.hot_keys is not None:
+            self.hot_keys.touch(*(f"{prefix}:{object_id}" for object_id in ids))
+        keys = {
+            object_id: f"{self.key_prefix}:{prefix}:{object_id}" for object_id in ids
+        }
+        cached = await self.get_many(
+            keys=list(keys.values()), timeout=timeout, default=MISSING
+        )
+        found = {
+            object_id: value
+            for object_id, value in zip(ids, cached)
+            if value is not MISSING
+        }
+        if missing := [object_id for object_id in ids if object_id not in found]:
+            loaded = await func(missing)
+            absent = [object_id for object_id in missing if object_id not in loaded]
+            await self.set_many(
+                {keys[object_id]: value for object_id, value in loaded.items()},
+                timeout=timeout,
+                expire=ttl,
+            )
+            if negative_ttl and absent:
+                await self.set_many(
+                    {keys[object_id]: None for object_id in absent},
+                    timeout=timeout,
+                    expire=negative_ttl,
+                )
+            else:
+                absent = []
+            await self._register_tags(
+                {
+                    keys[object_id]: [f"{prefix}:{object_id}"]
+                    for object_id in [*loaded, *absent]
+                },
+                timeout=timeout,
+                expire=ttl,
+            )
+            found.update(loaded)
+        return {
+            object_id: value for object_id, value in found.items() if value is not None
+        }
 
     @overload
-    def cache(self, func, ttl=60, timeout=0.07, *args, **kwargs) -> Any:
+    def cache(
+        self,
+        func,
+        ttl=60,
+        timeout=0.07,
+        *args,
+        stale_ttl=0,
+        lock_ttl=None,
+        tags=(),
+        negative_ttl=None,
+        key=None,
+        **kwargs,
+    ) -> Any:
         """
         Кешировать результат функции
         :param func: функция
         :param ttl: время жизни кеша в секундах
         :param timeout: время ожидания ответа от redis в секундах
+        :param stale_ttl: сколько секунд после ttl отдавать устаревшее значение,
+            обновляя его в фоне
+        :param lock_ttl: время жизни блокировки загрузчика в redis в секундах,
+            если не задано - загрузчик один только в пределах процесса
+        :param tags: теги, по которым запись можно удалить через invalidate_tags
+        :param negative_ttl: сколько секунд кешировать результат None,
+            0 - не кешировать, по умолчанию - negative_ttl кеша
+        :param key: явный ключ вида "<префикс>:<id>" вместо хеша аргументов,
+            общий с cache_many и попадающий в горячие ключи
         """
         ...
 
     @overload
-    def cache(self, ttl: float = 60, timeout: float = 0.07) -> callable:
+    def cache(
+        self,
+        ttl: float = 60,
+        timeout: float = 0.07,
+        stale_ttl: float = 0,
+        lock_ttl: Optional[float] = None,
+        tags: Sequence[str] = (),
+        negative_ttl: Optional[float] = None,
+        key: Optional[str] = None,
+    ) -> callable:
         """
         Декоратор для кеширования функции
         :param ttl: время жизни кеша в секундах
         :param timeout: время ожидания ответа от redis в секундах
+        :param stale_ttl: сколько секунд после ttl отдавать устаревшее значение,
+            обновляя его в фоне
+        :param lock_ttl: время жизни блокировки загрузчика в redis в секундах,
+            если не задано - загрузчик один только в пределах процесса
+        :param tags: теги, по которым запись можно удалить через invalidate_tags
+        :param negative_ttl: сколько секунд кешировать результат None,
+            0 - не кешировать, по умолчанию - negative_ttl кеша
+        :param key: явный ключ вида "<префикс>:<id>" вместо хеша аргументов,
+            общий с cache_many и попадающий в горячие ключи
         """
         ...
 
-    def cache(self, ttl: float = 60, timeout: float = 0.07, *args, **kwargs):
+    def cache(
+        self,
+        ttl: float = 60,
+        timeout: float = 0.07,
+        *args,
+        stale_ttl: float = 0,
+        lock_ttl: Optional[float] = None,
+        tags: Sequence[str] = (),
+        negative_ttl: Optional[float] = None,
+        key: Optional[str] = None,
+        **kwargs,
+    ):
+        if negative_ttl is None:
+            negative_ttl = self.negative_ttl
+        options = dict(
+            timeout=timeout,
+            expire=ttl,
+            stale_ttl=stale_ttl,
+            lock_ttl=lock_ttl,
+            tags=tuple(tags),
+            negative_ttl=negative_ttl,
+            key=key,
+        )
         if func_cached := kwargs.pop("func", None):
             if asyncio.iscoroutinefunction(func_cached):
-                return self._cache_impl(
-                    func=func_cached, *args, timeout=timeout, expire=ttl, **kwargs
-                )
+                return self._cache_impl(func_cached, *args, **options, **kwargs)
             return self.loop.run_until_complete(
-                self._cache_impl(
-                    func=func_cached, *args, timeout=timeout, expire=ttl, **kwargs
-                )
+                self._cache_impl(func_cached, *args, **options, **kwargs)
             )
 
         def decorator(func):
             @functools.wraps(func)
             async def async_wrapper(*local_args, **local_kwargs):
                 return await self._cache_impl(
-                    func, *local_args, timeout=timeout, expire=ttl, **local_kwargs
+                    func, *local_args, **options, **local_kwargs
                 )
 
             @functools.wraps(func)
             def sync_wrapper(*local_args, **local_kwargs):
                 return self.loop.run_until_complete(
-                    self._cache_impl(
-                        func, *local_args, timeout=timeout, expire=ttl, **local_kwargs
-                    )
+                    self._cache_impl(func, *local_args, **options, **local_kwargs)
                 )
 
             return async_wrapper if asyncio.iscoroutinefunction(func) else sync_wrapper
 
         return decorator
 
-    async def _cache_impl(self, func, *args, timeout, expire, **kwargs) -> Any:
-        cache_key = self._make_key(func, args, kwargs)
-        cached_value = await self.get(key=cache_key, timeout=timeout)
-        if cached_value:
-            return cached_value
-
-        if asyncio.iscoroutinefunction(func):
-            result = await func(*args, **kwargs)
+    async def _cache_impl(
+        self,
+        func,
+        *args,
+        timeout,
+        expire,
+        stale_ttl=0,
+        lock_ttl=None,
+        tags=(),
+        negative_ttl=0,
+        key=None,
+        **kwargs,
+    ) -> Any:
+        if key is None:
+            cache_key = self._make_key(func, args, kwargs)
         else:
-            result = func(*args, **kwargs)
+            cache_key = f"{self.key_prefix}:{key}"
+            if self.hot_keys is not None:
+                self.hot_keys.touch(key)
+        load = functools.partial(
+            self._load,
+            cache_key,
+            functools.partial(func, *args, **kwargs),
+            timeout=timeout,
+            expire=expire,
+            stale_ttl=stale_ttl,
+            lock_ttl=lock_ttl,
+            tags=tags,
+            negative_ttl=negative_ttl,
+        )
+        entry = await self._get_entry(key=cache_key, timeout=timeout)
+        if entry is MISSING:
+            return await self._single_flight(cache_key, load)
+        cached_value, fresh_until = entry
+        if stale_ttl and fresh_until and fresh_until <= time.time():
+            # Отдаем устаревшее значение, а свежее загружаем в фоне
+            refresh = self._single_flight(cache_key, load)
+            refresh.add_done_callback(self._log_refresh_error)
+        return cached_value
+
+    def _single_flight(self, key: str, load: Callable[[], Awaitable[Any]]):
+        # Все конкурентные промахи по ключу ждут одну загрузку, отмена ожидающего
+        # запроса не отменяет загрузку для остальных
+        if (task := self._in_flight.get(key)) is None:
+            task = asyncio.ensure_future(load())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return asyncio.shield(task)
+
+    def _log_refresh_error(self, future: asyncio.Future) -> None:
+        if not future.cancelled() and (error := future.exception()):
+            self.logger.error(f"Ошибка фонового обновления кеша: {error}")
 
-        await self.set(key=cache_key, value=result, expire=expire, timeout=timeout)
+    async def _load(
+        self,
+        key: str,
+        func: Callable[[], Any],
+        timeout: float,
+        expire: int | timedelta,
+        stale_ttl: float,
+        lock_ttl: Optional[float],
+        tags: Sequence[str] = (),
+        negative_ttl: float = 0,
+    ) -> Any:
+        if isinstance(expire, timedelta):
+            expire = expire.total_seconds()
+        lock_key, token = f"lock:{key}", uuid4().hex
+        # При разомкнутом размыкателе ждать чужую загрузку через redis бессмысленно
+        if self.breaker is not None and self.breaker.is_open:
+            lock_ttl = None
+        if lock_ttl and not await self._acquire(lock_key, token, lock_ttl, timeout):
+            cached_value = await self._wait_for_value(key, lock_key, lock_ttl, timeout)
+            if cached_value is not MISSING:
+                return cached_value
+
+        try:
+            result = func()
+            if asyncio.iscoroutine(result):
+                result = await result
+            fresh_until = 0
+            if result is None:
+                if not negative_ttl:
+                    return result
+                stored_for = math.ceil(negative_ttl)
+            elif stale_ttl:
+                fresh_until = time.time() + expire
+                stored_for = math.ceil(expire + stale_ttl)
+            else:
+                stored_for = math.ceil(expire)
+            await self.set(
+                key=key,
+                value=result,
+                expire=stored_for,
+                timeout=timeout,
+                fresh_until=fresh_until,
+            )
+            if tags:
+                await self._register_tags(
+                    {key: tags}, timeout=timeout, expire=stored_for
+                )
+            return result
+        finally:
+            if lock_ttl:
+                await run_with_timeout(
+                    self.redis.eval(self._release_script, 1, lock_key, token),
+                    timeout=timeout,
+                    operation_name="RedisCache Unlock",
+                    logger=self.logger,
+                    breaker=self.breaker,
+                )
 
-        return result
+    async def _acquire(
+        self, lock_key: str, token: str, lock_ttl: float, timeout: float
+    ) -> bool:
+        acquired = await run_with_timeout(
+            self.redis.set(lock_key, token, nx=True, px=int(lock_ttl * 1000)),
+            timeout=timeout,
+            operation_name="RedisCache Lock",
+            logger=self.logger,
+            breaker=self.breaker,
+        )
+        # Если redis недоступен, ожидающий сразу увидит отсутствие блокировки
+        # и загрузит значение сам
+        return bool(acquired)
+
+    async def _wait_for_value(
+        self, key: str, lock_key: str, lock_ttl: float, timeout: float
+    ) -> Any:
+        deadline = time.monotonic() + lock_ttl
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.lock_poll_interval)
+            cached_value = await self.get(key=key, timeout=timeout, default=MISSING)
+            if cached_value is not MISSING:
+                return cached_value
+            locked = await run_with_timeout(
+                self.redis.exists(lock_key),
+                timeout=timeout,
+                operation_name="RedisCache Lock Exists",
+                logger=self.logger,
+                breaker=self.breaker,
+            )
+            if not locked:
+                break
+        return MISSING
 
-    @staticmethod
-    def _make_key(func, args, kwargs) -> str:
-        return f"{func.__module__}.{func.__name__}:{args}:{kwargs}"
+    def _make_key(self, func, args, kwargs) -> str:
+        # Ключ не зависит от repr аргументов и порядка kwargs, длина ограничена хешем
+        payload = orjson.dumps([args, kwargs], option=orjson.OPT_SORT_KEYS, default=str)
+        digest = hashlib.blake2b(payload, digest_size=16).hexdigest()
+        return f"{self.key_prefix}:{func.__module__}.{func.__qualname__}:{digest}"
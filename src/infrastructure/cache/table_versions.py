@@ -0,0 +1,53 @@
+import logging
+from typing import Dict, Optional
+
+from redis.asyncio import Redis
+
+from infrastructure.handlers.asyncio_handlers import run_with_timeout
+
+
+class TableVersions:
+    """
+    Счетчики версий таблиц: каждая запись в таблицу увеличивает версию, поэтому
+    кеш, в ключ которого входит версия, устаревает за O(1) без перебора ключей
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        prefix: str = "table_version",
+        timeout: float = 0.07,
+        logger: logging.Logger = logging,
+    ) -> None:
+        self.redis = redis
+        self.prefix = prefix
+        self.timeout = timeout
+        self.logger = logger
+
+    def _key(self, table: str) -> str:
+        return f"{self.prefix}:{table}"
+
+    async def get(self, *tables: str) -> Optional[Dict[str, int]]:
+        """
+        Текущие версии таблиц, None - если redis недоступен и кешу верить нельзя
+        """
+        versions = await run_with_timeout(
+            self.redis.mget([self._key(table) for table in tables]),
+            timeout=self.timeout,
+            operation_name="TableVersions Get",
+            logger=self.logger,
+        )
+        if versions is None:
+            return None
+        return {table: int(version or 0) for table, version in zip(tables, versions)}
+
+    async def bump(self, *tables: str) -> None:
+        pipeline = self.redis.pipeline(transaction=False)
+        for table in tables:
+            pipeline.incr(self._key(table))
+        await run_with_timeout(
+            pipeline.execute(),
+            timeout=self.timeout,
+            operation_name="TableVersions Bump",
+            logger=self.logger,
+        )
@@ -0,0 +1,126 @@
+import logging
+from datetime import datetime
+from typing import Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+from redis.asyncio import Redis
+
+from infrastructure.handlers.asyncio_handlers import run_with_timeout
+
+
+class TimelineCache:
+    """
+    Ленты профилей: ограниченные sorted set Redis (uuid поста -> время публикации)
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        prefix: str = "feed",
+        size: int = 500,
+        ttl: int = 7 * 24 * 60 * 60,
+        high_degree_threshold: int = 5000,
+        timeout: float = 0.1,
+        logger: logging.Logger = logging,
+    ) -> None:
+        self.redis = redis
+        self.prefix = prefix
+        self.size = size
+        self.ttl = ttl
+        self.high_degree_threshold = high_degree_threshold
+        self.timeout = timeout
+        self.logger = logger
+
+    @property
+    def high_degree_key(self) -> str:
+        return f"{self.prefix}:high_degree"
+
+    def _key(self, profile_uuid: UUID | str) -> str:
+        return f"{self.prefix}:{profile_uuid}"
+
+    async def push(
+        self,
+        profile_uuids: Iterable[UUID | str],
+        post_uuid: UUID | str,
+        created_at: datetime,
+    ) -> None:
+        pipeline = self.redis.pipeline(transaction=False)
+        for profile_uuid in profile_uuids:
+            key = self._key(profile_uuid)
+            pipeline.zadd(key, {str(post_uuid): created_at.timestamp()})
+            pipeline.zremrangebyrank(key, 0, -(self.size + 1))
+            pipeline.expire(key, self.ttl)
+        await run_with_timeout(
+            pipeline.execute(),
+            timeout=self.timeout,
+            operation_name="TimelineCache Push",
+            logger=self.logger,
+        )
+
+    async def read(
+        self,
+        profile_uuid: UUID | str,
+        limit: int,
+        before: Optional[float] = None,
+        before_uuid: Optional[UUID | str] = None,
+    ) -> List[Tuple[UUID, float]]:
+        """
+        Записи ленты по убыванию (время, uuid) строго после курсора
+        (before, before_uuid). Без before_uuid граница before исключающая
+        """
+        key = self._key(profile_uuid)
+        max_score = "+inf"
+        skip = 0
+        if before is not None and before_uuid is None:
+            max_score = f"({before}"
+        elif before is not None:
+            # Граница включающая: у постов одной пачки время совпадает, и
+            # исключающая граница потеряла бы их на стыке страниц. Записи с тем
+            # же временем Redis отдает по убыванию uuid, уже показанные идут
+            # первыми - их не больше, чем всех записей с этим временем
+            max_score = before
+            skip = await run_with_timeout(
+                self.redis.zcount(key, before, before),
+                timeout=self.timeout,
+                operation_name="TimelineCache Count",
+                logger=self.logger,
+            )
+        result = await run_with_timeout(
+            self.redis.zrevrangebyscore(
+                key,
+                max=max_score,
+                min="-inf",
+                start=0,
+                num=limit + (skip or 0),
+                withscores=True,
+            ),
+            timeout=self.timeout,
+            operation_name="TimelineCache Read",
+            logger=self.logger,
+        )
+        entries = [(UUID(post_uuid), score) for post_uuid, score in result or []]
+        if before_uuid is not None:
+            before_uuid = UUID(str(before_uuid))
+            entries = [
+                (post_uuid, score)
+                for post_uuid, score in entries
+                if score < before or post_uuid < before_uuid
+            ]
+        return entries[:limit]
+
+    async def mark_high_degree(self, profile_uuid: UUID | str) -> None:
+        await run_with_timeout(
+            self.redis.sadd(self.high_degree_key, str(profile_uuid)),
+            timeout=self.timeout,
+            operation_name="TimelineCache Mark",
+            logger=self.logger,
+        )
+
+    async def high_degree_profiles(self) -> Set[UUID]:
+        result = await run_with_timeout(
+            self.redis.smembers(self.high_degree_key),
+            timeout=self.timeout,
+            operation_name="TimelineCache High Degree",
+            logger=self.logger,
+        )
+        return {UUID(profile_uuid) for profile_uuid in result or []}
@@ -0,0 +1,84 @@
+import logging
+import math
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from redis.asyncio import Redis
+
+from infrastructure.handlers.asyncio_handlers import run_with_timeout
+
+
+class TrendingIndex:
+    """
+    Индекс трендов на sorted set Redis с экспоненциальным затуханием (forward decay)
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        prefix: str = "post:trending",
+        half_life: int = 6 * 60 * 60,
+        epoch: int = 24 * 60 * 60,
+        timeout: float = 0.1,
+        logger: logging.Logger = logging,
+    ) -> None:
+        self.redis = redis
+        self.prefix = prefix
+        self.tau = half_life / math.log(2)
+        self.epoch = epoch
+        self.timeout = timeout
+        self.logger = logger
+
+    def _epoch(self, moment: datetime) -> int:
+        return int(moment.timestamp() // self.epoch)
+
+    def _key(self, epoch: int) -> str:
+        return f"{self.prefix}:{epoch}"
+
+    def _weight(self, moment: datetime, epoch: int) -> float:
+        return math.exp((moment.timestamp() - epoch * self.epoch) / self.tau)
+
+    async def add(self, *members: str, moment: Optional[datetime] = None) -> None:
+        moment = moment or datetime.now()
+        await self._change([(member, moment, 1) for member in members])
+
+    async def remove(self, member: str, moment: datetime) -> None:
+        await self._change([(member, moment, -1)])
+
+    async def _change(self, changes: List[Tuple[str, datetime, int]]) -> None:
+        # Вклад события растет от начала эпохи, поэтому порядок в sorted set уже
+        # совпадает с порядком по затухшему счету. Событие пишется в свою и
+        # следующую эпоху, чтобы на границе эпох тренды не обнулялись.
+        pipeline = self.redis.pipeline(transaction=False)
+        for member, moment, sign in changes:
+            if not member:
+                continue
+            epoch = self._epoch(moment)
+            for target in (epoch, epoch + 1):
+                key = self._key(target)
+                weight = sign * self._weight(moment, target)
+                if sign > 0:
+                    pipeline.zincrby(key, weight, member.lower())
+                    pipeline.expire(key, 2 * self.epoch)
+                else:
+                    # XX: не создаем заново уже истекшую эпоху
+                    pipeline.zadd(key, {member.lower(): weight}, xx=True, incr=True)
+                    pipeline.zremrangebyscore(key, "-inf", 0)
+        await run_with_timeout(
+            pipeline.execute(),
+            timeout=self.timeout,
+            operation_name="TrendingIndex Change",
+            logger=self.logger,
+        )
+
+    async def top(self, limit: int = 10) -> List[Tuple[str, float]]:
+        now = datetime.now()
+        epoch = self._epoch(now)
+        result = await run_with_timeout(
+            self.redis.zrevrange(self._key(epoch), 0, limit - 1, withscores=True),
+            timeout=self.timeout,
+            operation_name="TrendingIndex Top",
+            logger=self.logger,
+        )
+        decay = 1 / self._weight(now, epoch)
+        return [(member, score * decay) for member, score in result or []]
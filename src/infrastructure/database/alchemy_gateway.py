@@ -1,7 +1,99 @@
-from sqlalchemy import AsyncAdaptedQueuePool, Pool
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+import asyncio
+import itertools
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+from uuid import uuid4
+
+from greenlet import getcurrent
+from sqlalchemy import AsyncAdaptedQueuePool, NullPool, Pool, text
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 
 from infrastructure.base_entities.singleton import Singleton
+from infrastructure.database.unit_of_work import (
+    JoiningSessionFactory,
+    UnitOfWork,
+    current_unit_of_work,
+)
+from infrastructure.handlers.asyncio_handlers import fire_and_forget
+
+# До этого момента чтения текущего запроса идут в primary (read-your-writes)
+primary_reads_until: ContextVar[float] = ContextVar("primary_reads_until", default=0)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Очередь соединений, которая замеряет ожидание свободного соединения
+    и отдельно - открытие новых соединений при росте пула
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.connects = 0
+        self.connect_total = 0.0
+        self.connect_max = 0.0
+        # Время открытия соединений внутри текущего _do_get каждого greenlet
+        self._connecting: Dict[Any, float] = {}
+
+    def _do_get(self):
+        caller = getcurrent()
+        self._connecting[caller] = 0.0
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            connecting = self._connecting.pop(caller, 0.0)
+            waited = time.perf_counter() - started - connecting
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def _create_connection(self):
+        started = time.perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            elapsed = time.perf_counter() - started
+            self.connects += 1
+            self.connect_total += elapsed
+            self.connect_max = max(self.connect_max, elapsed)
+            caller = getcurrent()
+            if caller in self._connecting:
+                self._connecting[caller] += elapsed
+
+
+class Replica:
+    """
+    Движок реплики и ее отставание по последней проверке
+    """
+
+    def __init__(self, name: str, engine: AsyncEngine) -> None:
+        self.name = name
+        self.engine = engine
+        self.session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+        # None - отставание еще не проверено или реплика недоступна
+        self.lag: Optional[float] = None
+        self.reads = 0
+
+    def busy(self) -> int:
+        pool = self.engine.pool
+        return pool.checkedout() if isinstance(pool, AsyncAdaptedQueuePool) else 0
+
+
+class ReadSessionFactory:
+    """
+    Фабрика сессий чтения: каждая новая сессия открывается на выбранной реплике
+    """
+
+    def __init__(self, manager: "SessionManager") -> None:
+        self.manager = manager
+
+    def __call__(self, **kwargs):
+        return self.manager.choose_read_factory()(**kwargs)
 
 
 class SessionManager(Singleton):
@@ -14,7 +106,20 @@ class SessionManager(Singleton):
         password: str,
         database: str,
         echo: bool,
-        poolclass: Pool = AsyncAdaptedQueuePool,
+        poolclass: Pool = TimedQueuePool,
+        pool_min_size: int = 10,
+        pool_max_size: int = 20,
+        pool_timeout: float = 30,
+        pool_recycle: int = 1800,
+        pool_pre_ping: bool = True,
+        pgbouncer: bool = False,
+        statement_cache_size: int = 500,
+        replicas: Sequence[Dict[str, Any]] = (),
+        replica_strategy: str = "round_robin",
+        max_replica_lag: float = 1,
+        replica_check_interval: float = 1,
+        read_your_writes_window: float = 5,
+        logger: logging.Logger = logging,
     ):
         self.dialect = dialect
         self.login = login
@@ -23,24 +128,95 @@ class SessionManager(Singleton):
         self.port = port
         self.echo = echo
         self.database = database
+        self.pgbouncer = pgbouncer
+        self.statement_cache_size = statement_cache_size
+        self.replica_strategy = replica_strategy
+        self.max_replica_lag = max_replica_lag
+        self.replica_check_interval = replica_check_interval
+        self.read_your_writes_window = read_your_writes_window
+        self.logger = logger
 
-        self._engine = create_async_engine(
-            url=self._db_url,
+        engine_options = dict(
             echo=self.echo,
             poolclass=poolclass,
+            connect_args=self._connect_args,
+            **self._pool_options(
+                poolclass,
+                pool_min_size=pool_min_size,
+                pool_max_size=pool_max_size,
+                pool_timeout=pool_timeout,
+                pool_recycle=pool_recycle,
+                pool_pre_ping=pool_pre_ping,
+            ),
         )
+        self._engine = create_async_engine(url=self._db_url, **engine_options)
+        self._replicas: List[Replica] = [
+            Replica(
+                name=f"{replica['host']}:{replica.get('port', self.port)}",
+                engine=create_async_engine(
+                    url=self._make_url(replica["host"], replica.get("port", self.port)),
+                    **engine_options,
+                ),
+            )
+            for replica in replicas
+        ]
+        self._round_robin = itertools.count()
+        self._monitor: Optional[asyncio.Task] = None
         self._autocommit_session = self._engine.execution_options(
             isolation_level="AUTOCOMMIT",
         )
-        self._transactional_session = async_sessionmaker(
-            bind=self._engine,
-            expire_on_commit=False,
+        self._transactional_session = JoiningSessionFactory(
+            async_sessionmaker(bind=self._engine, expire_on_commit=False)
+        )
+        self._async_session_factory = JoiningSessionFactory(
+            async_sessionmaker(bind=self._engine)
         )
-        self._async_session_factory = async_sessionmaker(bind=self._engine)
+        self._read_session_factory = ReadSessionFactory(self)
+
+    @staticmethod
+    def _pool_options(
+        poolclass: Pool,
+        pool_min_size: int,
+        pool_max_size: int,
+        pool_timeout: float,
+        pool_recycle: int,
+        pool_pre_ping: bool,
+    ) -> Dict[str, Any]:
+        options = {"pool_pre_ping": pool_pre_ping}
+        if issubclass(poolclass, NullPool):
+            return options
+        # pool_min_size постоянных соединений, до pool_max_size вместе с overflow
+        return options | {
+            "pool_size": pool_min_size,
+            "max_overflow": max(pool_max_size - pool_min_size, 0),
+            "pool_timeout": pool_timeout,
+            "pool_recycle": pool_recycle,
+        }
+
+    @property
+    def _connect_args(self) -> Dict[str, Any]:
+        if not self.pgbouncer:
+            # Кеш prepared statements asyncpg и его обертки в SQLAlchemy: повторный
+            # запрос с тем же SQL не готовится заново на сервере
+            return {
+                "statement_cache_size": self.statement_cache_size,
+                "prepared_statement_cache_size": self.statement_cache_size,
+            }
+        # В transaction mode pgbouncer соседние транзакции идут через разные
+        # серверные соединения, поэтому подготовленные выражения нельзя кешировать
+        # и их имена должны быть уникальными
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
 
     @property
     def _db_url(self) -> str:
-        return f"postgresql+{self.dialect}://{self.login}:{self.password}@{self.host}:{self.port}/{self.database}"
+        return self._make_url(self.host, self.port)
+
+    def _make_url(self, host: str, port: int) -> str:
+        return f"postgresql+{self.dialect}://{self.login}:{self.password}@{host}:{port}/{self.database}"
 
     @property
     def transactional_session(self):
@@ -49,3 +225,129 @@ class SessionManager(Singleton):
     @property
     def async_session_factory(self):
         return self._async_session_factory
+
+    @property
+    def autocommit_engine(self):
+        return self._autocommit_session
+
+    def unit_of_work(self) -> UnitOfWork:
+        return UnitOfWork(self._engine)
+
+    async def request_unit_of_work(self) -> AsyncIterator[UnitOfWork]:
+        """
+        Зависимость FastAPI: единица работы на весь запрос, фиксируется
+        до отправки ответа и откатывается при исключении в обработчике
+        """
+        async with self.unit_of_work() as unit_of_work:
+            yield unit_of_work
+
+    @property
+    def read_session_factory(self):
+        return self._read_session_factory
+
+    def choose_read_factory(self) -> async_sessionmaker:
+        """
+        Реплика для очередного чтения; primary, если реплик нет, все отстают
+        больше max_replica_lag, запрос несет свежий токен read-your-writes
+        или чтение идет внутри единицы работы
+        """
+        if (
+            not self._replicas
+            or primary_reads_until.get() > time.time()
+            or current_unit_of_work.get() is not None
+        ):
+            return self._transactional_session
+        healthy = [
+            replica
+            for replica in self._replicas
+            if replica.lag is not None and replica.lag <= self.max_replica_lag
+        ]
+        if not healthy:
+            return self._transactional_session
+        if self.replica_strategy == "least_busy":
+            replica = min(healthy, key=Replica.busy)
+        else:
+            replica = healthy[next(self._round_robin) % len(healthy)]
+        replica.reads += 1
+        return replica.session_factory
+
+    def issue_token(self) -> str:
+        """
+        Токен после записи: пока он не истек, чтения с ним идут в primary
+        """
+        return f"{time.time() + self.read_your_writes_window:.3f}"
+
+    @staticmethod
+    def accept_token(token: str) -> None:
+        try:
+            primary_reads_until.set(float(token))
+        except ValueError:
+            pass
+
+    async def start_replica_monitor(self) -> None:
+        if self._replicas and self._monitor is None:
+            self._monitor = fire_and_forget(self._monitor_replicas())
+
+    async def _monitor_replicas(self) -> None:
+        while True:
+            await asyncio.gather(
+                *(self._check_lag(replica) for replica in self._replicas)
+            )
+            await asyncio.sleep(self.replica_check_interval)
+
+    async def _check_lag(self, replica: Replica) -> None:
+        # Если все полученное WAL уже применено, реплика не отстает, даже если
+        # на primary давно не было записей
+        query = text(
+            "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+            "THEN 0 ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) "
+            "END"
+        )
+        try:
+            async with replica.engine.connect() as connection:
+                lag = await asyncio.wait_for(
+                    connection.scalar(query), timeout=self.replica_check_interval
+                )
+        except Exception as error:
+            if replica.lag is not None:
+                self.logger.error(f"Реплика {replica.name} недоступна: {error}")
+            replica.lag = None
+            return
+        replica.lag = float(lag or 0)
+
+    def pool_stats(self) -> Dict[str, Any]:
+        stats = self._engine_stats(self._engine)
+        if self._replicas:
+            stats["replicas"] = [
+                {"name": replica.name, "lag": replica.lag, "reads": replica.reads}
+                | self._engine_stats(replica.engine)
+                for replica in self._replicas
+            ]
+        return stats
+
+    @staticmethod
+    def _engine_stats(engine: AsyncEngine) -> Dict[str, Any]:
+        pool = engine.pool
+        stats = {"pool": pool.status()}
+        if isinstance(pool, AsyncAdaptedQueuePool):
+            stats |= {
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+            }
+        if isinstance(pool, TimedQueuePool):
+            stats |= {
+                "checkouts": pool.checkouts,
+                "wait_total": round(pool.wait_total, 6),
+                "wait_max": round(pool.wait_max, 6),
+                "wait_avg": (
+                    round(pool.wait_total / pool.checkouts, 6)
+                    if pool.checkouts
+                    else 0.0
+                ),
+                "connects": pool.connects,
+                "connect_total": round(pool.connect_total, 6),
+                "connect_max": round(pool.connect_max, 6),
+            }
+        return stats
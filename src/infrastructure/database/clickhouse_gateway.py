@@ -123,6 +123,8 @@ class ClickHouseManager:
         table_name = model.__tablename__
         columns = {}
         for column in model.__table__.columns:
+            if column.computed is not None:
+                continue
             column_name = column.name
             column_type = str(column.type)
             columns[column_name] = self.clickhouse_types[column_type]
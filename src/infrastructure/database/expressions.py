@@ -0,0 +1,16 @@
+from typing import Sequence, Union
+from uuid import UUID
+
+from sqlalchemy import UUID as SAUUID
+from sqlalchemy import BindParameter, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY
+
+
+def uuid_array(name: str, uuids: Sequence[Union[UUID, str]]) -> BindParameter:
+    # Один параметр-массив для "= ANY(...)" вместо IN (...): текст запроса
+    # не зависит от числа id, и подготовленный запрос asyncpg переиспользуется
+    return bindparam(
+        name,
+        value=[UUID(str(uuid)) for uuid in uuids],
+        type_=ARRAY(SAUUID(as_uuid=True)),
+    )
@@ -0,0 +1,213 @@
+"""partition posts by month
+
+Revision ID: 4298b4b6392c
+Revises: b782fbbf8daa
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+
+from datetime import date
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "4298b4b6392c"
+down_revision: Union[str, None] = "b782fbbf8daa"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Остальные будущие секции создает фоновая задача partitions_task
+months_ahead = 3
+
+indexes = (
+    ("idx_posts_search_vector", ["search_vector"], "gin"),
+    ("idx_posts_created_at", ["created_at", "uuid"], None),
+    ("idx_posts_updated_at", ["updated_at", "uuid"], None),
+    ("idx_posts_likes", ["likes", "uuid"], None),
+    ("idx_posts_header", ["header", "uuid"], None),
+    ("idx_posts_hashtag", ["hashtag"], None),
+)
+# Заменяет уникальный индекс по profile_id для выборок постов авторов
+author_index = ("idx_posts_profile_id_created_at", ["profile_id", "created_at"], None)
+
+# Один пост на профиль во всех секциях: секционированная таблица не может
+# сделать profile_id уникальным, поэтому автор каждого поста занимает строку
+# post_authors. Строку, уже занятую bulk_create для этого поста, не трогаем
+claim_author_function = """
+CREATE OR REPLACE FUNCTION posts_claim_author() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM post_authors WHERE uuid = OLD.uuid;
+        RETURN OLD;
+    END IF;
+    IF TG_OP = 'UPDATE' THEN
+        IF NEW.uuid = OLD.uuid AND NEW.profile_id = OLD.profile_id THEN
+            RETURN NEW;
+        END IF;
+        DELETE FROM post_authors WHERE uuid = OLD.uuid;
+    END IF;
+    PERFORM 1 FROM post_authors
+    WHERE uuid = NEW.uuid AND profile_id = NEW.profile_id;
+    IF NOT FOUND THEN
+        INSERT INTO post_authors (uuid, profile_id)
+        VALUES (NEW.uuid, NEW.profile_id);
+    END IF;
+    RETURN NEW;
+END;
+$$
+"""
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def create_claim_trigger(table: str) -> None:
+    op.execute(
+        "CREATE TRIGGER posts_claim_author "
+        f"AFTER INSERT OR UPDATE OF uuid, profile_id OR DELETE ON {table} "
+        "FOR EACH ROW EXECUTE FUNCTION posts_claim_author()"
+    )
+
+
+def upgrade() -> None:
+    # Старая таблица целиком становится секцией posts_legacy до начала
+    # следующего месяца: данные не копируются, тяжелые шаги идут без
+    # блокировки записи, под эксклюзивной блокировкой - только каталог
+    boundary = add_months(date.today().replace(day=1), 1)
+    with op.get_context().autocommit_block():
+        op.create_table(
+            "post_authors",
+            sa.Column("uuid", sa.UUID(), nullable=False),
+            sa.Column("profile_id", sa.UUID(), nullable=False),
+            sa.Column(
+                "created_at",
+                sa.DateTime(),
+                server_default=sa.func.now(),
+                nullable=False,
+            ),
+            sa.Column(
+                "updated_at",
+                sa.DateTime(),
+                server_default=sa.func.now(),
+                nullable=False,
+            ),
+            sa.ForeignKeyConstraint(
+                ["profile_id"], ["profiles.uuid"], ondelete="CASCADE"
+            ),
+            sa.PrimaryKeyConstraint("uuid"),
+            sa.UniqueConstraint("profile_id"),
+            if_not_exists=True,
+        )
+        op.execute(claim_author_function)
+        # Сначала триггер, затем перенос уже существующих авторов: новые посты
+        # занимают строку сами, перенос пропускает их через ON CONFLICT
+        op.execute("DROP TRIGGER IF EXISTS posts_claim_author ON posts")
+        create_claim_trigger("posts")
+        op.execute(
+            "INSERT INTO post_authors (uuid, profile_id) "
+            "SELECT uuid, profile_id FROM posts ON CONFLICT DO NOTHING"
+        )
+        # Пост, удаленный во время переноса, мог оставить за собой строку
+        op.execute(
+            "DELETE FROM post_authors a "
+            "WHERE NOT EXISTS (SELECT 1 FROM posts p WHERE p.uuid = a.uuid)"
+        )
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS "
+            "posts_legacy_pkey_new ON posts (uuid, created_at)"
+        )
+        name, columns, _ = author_index
+        op.create_index(
+            name,
+            "posts",
+            columns,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        # Проверенное ограничение избавляет ATTACH PARTITION от сканирования
+        op.execute(
+            "ALTER TABLE posts ADD CONSTRAINT posts_legacy_range "
+            f"CHECK (created_at < '{boundary}') NOT VALID"
+        )
+        op.execute("ALTER TABLE posts VALIDATE CONSTRAINT posts_legacy_range")
+
+    op.execute(
+        "ALTER TABLE posts DROP CONSTRAINT posts_pkey, "
+        "ADD CONSTRAINT posts_legacy_pkey PRIMARY KEY "
+        "USING INDEX posts_legacy_pkey_new"
+    )
+    # Уникальность profile_id теперь держит post_authors
+    op.drop_constraint("posts_profile_id_key", "posts")
+    # Секция получит триггер родительской таблицы при ATTACH
+    op.execute("DROP TRIGGER posts_claim_author ON posts")
+    op.rename_table("posts", "posts_legacy")
+    for name, _, _ in (*indexes, author_index):
+        op.execute(
+            f"ALTER INDEX {name} RENAME TO "
+            f"{name.replace('idx_posts_', 'posts_legacy_')}"
+        )
+
+    op.execute(
+        "CREATE TABLE posts (LIKE posts_legacy INCLUDING DEFAULTS "
+        "INCLUDING GENERATED INCLUDING STORAGE) PARTITION BY RANGE (created_at)"
+    )
+    op.create_primary_key("posts_pkey", "posts", ["uuid", "created_at"])
+    op.create_foreign_key(
+        "posts_profile_id_fkey",
+        "posts",
+        "profiles",
+        ["profile_id"],
+        ["uuid"],
+        ondelete="CASCADE",
+    )
+    # На пустой секционированной таблице индексы создаются мгновенно,
+    # при ATTACH к ним привязываются одинаковые индексы posts_legacy
+    for name, columns, using in (*indexes, author_index):
+        op.create_index(name, "posts", columns, postgresql_using=using)
+    create_claim_trigger("posts")
+
+    op.execute(
+        "ALTER TABLE posts ATTACH PARTITION posts_legacy "
+        f"FOR VALUES FROM (MINVALUE) TO ('{boundary}')"
+    )
+    op.drop_constraint("posts_legacy_range", "posts_legacy")
+    for offset in range(months_ahead + 1):
+        start = add_months(boundary, offset)
+        op.execute(
+            f"CREATE TABLE posts_p{start:%Y_%m} PARTITION OF posts "
+            f"FOR VALUES FROM ('{start}') TO ('{add_months(start, 1)}')"
+        )
+
+
+def downgrade() -> None:
+    # Обратно - копированием в обычную таблицу, уникальность profile_id
+    # снова держит сама posts
+    op.execute(
+        "CREATE TABLE posts_unpartitioned (LIKE posts INCLUDING DEFAULTS "
+        "INCLUDING GENERATED INCLUDING STORAGE)"
+    )
+    columns = "uuid, header, hashtag, body, likes, profile_id, created_at, updated_at"
+    op.execute(
+        f"INSERT INTO posts_unpartitioned ({columns}) SELECT {columns} FROM posts"
+    )
+    op.drop_table("posts")
+    op.rename_table("posts_unpartitioned", "posts")
+    op.create_primary_key("posts_pkey", "posts", ["uuid"])
+    op.create_unique_constraint("posts_profile_id_key", "posts", ["profile_id"])
+    op.create_foreign_key(
+        "posts_profile_id_fkey",
+        "posts",
+        "profiles",
+        ["profile_id"],
+        ["uuid"],
+        ondelete="CASCADE",
+    )
+    for name, columns, using in indexes:
+        op.create_index(name, "posts", columns, postgresql_using=using)
+    op.drop_table("post_authors")
+    op.execute("DROP FUNCTION posts_claim_author()")
@@ -0,0 +1,36 @@
+"""like batches
+
+Revision ID: 5c1d7e2a9b40
+Revises: 4298b4b6392c
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5c1d7e2a9b40"
+down_revision: Union[str, None] = "4298b4b6392c"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "like_batches",
+        sa.Column("uuid", sa.UUID(), nullable=False),
+        sa.Column(
+            "created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False
+        ),
+        sa.Column(
+            "updated_at", sa.DateTime(), server_default=sa.func.now(), nullable=False
+        ),
+        sa.PrimaryKeyConstraint("uuid"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("like_batches")
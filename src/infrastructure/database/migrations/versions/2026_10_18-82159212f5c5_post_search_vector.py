@@ -0,0 +1,62 @@
+"""post search vector
+
+Revision ID: 82159212f5c5
+Revises: b6e5e3a40a9e
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "82159212f5c5"
+down_revision: Union[str, None] = "b6e5e3a40a9e"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # ВНИМАНИЕ: хранимая генерируемая колонка переписывает всю таблицу posts
+    # под ACCESS EXCLUSIVE - чтение и запись постов стоят до конца перезаписи,
+    # на большой таблице это минуты. Катить в окно обслуживания.
+    # Обычная колонка с триггером и пакетным заполнением обошлась бы без
+    # перезаписи, но модель и секционирование (LIKE ... INCLUDING GENERATED)
+    # опираются на генерируемую колонку. lock_timeout не дает миграции
+    # встать в очередь за долгой транзакцией и заблокировать всех за собой
+    op.execute("SET LOCAL lock_timeout = '5s'")
+    op.add_column(
+        "posts",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "setweight(to_tsvector('russian', coalesce(header, '')), 'A') || "
+                "setweight(to_tsvector('russian', coalesce(body, '')), 'B')",
+                persisted=True,
+            ),
+            nullable=True,
+        ),
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "idx_posts_search_vector",
+            "posts",
+            ["search_vector"],
+            unique=False,
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "idx_posts_search_vector",
+            table_name="posts",
+            postgresql_concurrently=True,
+        )
+    op.drop_column("posts", "search_vector")
@@ -0,0 +1,54 @@
+"""registry indexes
+
+Revision ID: b782fbbf8daa
+Revises: 82159212f5c5
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b782fbbf8daa"
+down_revision: Union[str, None] = "82159212f5c5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+indexes = (
+    ("idx_posts_created_at", "posts", ["created_at", "uuid"]),
+    ("idx_posts_updated_at", "posts", ["updated_at", "uuid"]),
+    ("idx_posts_likes", "posts", ["likes", "uuid"]),
+    ("idx_posts_header", "posts", ["header", "uuid"]),
+    ("idx_posts_hashtag", "posts", ["hashtag"]),
+    ("idx_profiles_created_at", "profiles", ["created_at", "uuid"]),
+    ("idx_profiles_updated_at", "profiles", ["updated_at", "uuid"]),
+    ("idx_profiles_first_name", "profiles", ["first_name", "uuid"]),
+    ("idx_profiles_last_name", "profiles", ["last_name", "uuid"]),
+    ("idx_friends_friend_id", "friends", ["friend_id"]),
+)
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in indexes:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(indexes):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -1,6 +1,8 @@
 from .base import Base
 from .friend import Friend
+from .like_batch import LikeBatch
 from .post import Post
+from .post_author import PostAuthor
 from .profile import Profile
 
-__all__ = ("Base", "Profile", "Post", "Friend")
+__all__ = ("Base", "Profile", "Post", "PostAuthor", "Friend", "LikeBatch")
@@ -1,6 +1,6 @@
 from uuid import UUID
 
-from sqlalchemy import ForeignKey, UniqueConstraint
+from sqlalchemy import ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column
 
 from infrastructure.database.models.base import Base
@@ -9,6 +9,8 @@ from infrastructure.database.models.base import Base
 class Friend(Base):
     __table_args__ = (
         UniqueConstraint("profile_id", "friend_id", name="idx_unique_profile_friend"),
+        # Подписчики профиля: уникальный индекс начинается с profile_id и не подходит
+        Index("idx_friends_friend_id", "friend_id"),
         {"extend_existing": True},
     )
 
@@ -0,0 +1,10 @@
+from infrastructure.database.models.base import Base
+
+
+class LikeBatch(Base):
+    """
+    Примененные пачки лайков из LikesCounter: uuid - id пачки. Строка пишется
+    в одной транзакции с put_likes, поэтому повторная пачка не применяется
+    """
+
+    __tablename__ = "like_batches"
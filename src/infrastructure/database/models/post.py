@@ -1,6 +1,18 @@
+from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import UUID, ForeignKey, Integer, String, Text
+from sqlalchemy import (
+    UUID,
+    Computed,
+    ForeignKey,
+    Index,
+    Integer,
+    PrimaryKeyConstraint,
+    String,
+    Text,
+    func,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
@@ -10,14 +22,44 @@ if TYPE_CHECKING:
 
 
 class Post(Base):
+    __table_args__ = (
+        Index("idx_posts_search_vector", "search_vector", postgresql_using="gin"),
+        # Keyset-пагинация: колонка сортировки + uuid как в KeysetPagination
+        Index("idx_posts_created_at", "created_at", "uuid"),
+        Index("idx_posts_updated_at", "updated_at", "uuid"),
+        Index("idx_posts_likes", "likes", "uuid"),
+        Index("idx_posts_header", "header", "uuid"),
+        Index("idx_posts_hashtag", "hashtag"),
+        Index("idx_posts_profile_id_created_at", "profile_id", "created_at"),
+        # Помесячные секции по created_at, см. MonthlyPartitions. Первичный ключ
+        # секционированной таблицы обязан включать ключ секционирования, а
+        # уникальность profile_id держит таблица post_authors, см. PostAuthor
+        PrimaryKeyConstraint("uuid", "created_at", name="posts_pkey"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
+    created_at: Mapped[datetime] = mapped_column(
+        primary_key=True,
+        server_default=func.now(),
+        default=datetime.now,
+    )
     header: Mapped[str] = mapped_column(String(50), unique=False, nullable=False)
     hashtag: Mapped[str] = mapped_column(String(30), unique=False, nullable=True)
     body: Mapped[str] = mapped_column(Text, unique=False, nullable=True)
     likes: Mapped[int] = mapped_column(Integer, default=0)
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('russian', coalesce(header, '')), 'A') || "
+            "setweight(to_tsvector('russian', coalesce(body, '')), 'B')",
+            persisted=True,
+        ),
+        nullable=True,
+        deferred=True,
+    )
 
     profile_id: Mapped[UUID] = mapped_column(
-        ForeignKey("profiles.uuid", ondelete="CASCADE"), unique=True, nullable=False
+        ForeignKey("profiles.uuid", ondelete="CASCADE"), nullable=False
     )
     author: Mapped["Profile"] = relationship(
         "Profile",
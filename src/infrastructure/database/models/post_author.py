@@ -0,0 +1,21 @@
+from uuid import UUID
+
+from sqlalchemy import ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from infrastructure.database.models.base import Base
+
+
+class PostAuthor(Base):
+    """
+    Автор каждого поста: uuid - uuid поста. Уникальный profile_id держит
+    правило "один пост на профиль" для всех секций posts, секционированная
+    таблица сама не может сделать profile_id уникальным. Строки ведет триггер
+    posts_claim_author, bulk_create занимает их заранее
+    """
+
+    __tablename__ = "post_authors"
+
+    profile_id: Mapped[UUID] = mapped_column(
+        ForeignKey("profiles.uuid", ondelete="CASCADE"), unique=True
+    )
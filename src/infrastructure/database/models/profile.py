@@ -1,6 +1,6 @@
 from typing import TYPE_CHECKING
 
-from sqlalchemy import String, Text
+from sqlalchemy import Index, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from infrastructure.database.models.base import Base
@@ -10,6 +10,14 @@ if TYPE_CHECKING:
 
 
 class Profile(Base):
+    __table_args__ = (
+        # Keyset-пагинация: колонка сортировки + uuid как в KeysetPagination
+        Index("idx_profiles_created_at", "created_at", "uuid"),
+        Index("idx_profiles_updated_at", "updated_at", "uuid"),
+        Index("idx_profiles_first_name", "first_name", "uuid"),
+        Index("idx_profiles_last_name", "last_name", "uuid"),
+    )
+
     user_uuid: Mapped[str] = mapped_column(
         String, unique=True, nullable=False, comment="УУИД юзера"
     )
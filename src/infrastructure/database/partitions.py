@@ -0,0 +1,121 @@
+import logging
+import re
+from datetime import date, datetime
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import text
+
+from infrastructure.database.alchemy_gateway import SessionManager
+
+
+def month_start(moment: date) -> date:
+    return date(moment.year, moment.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class Partition(NamedTuple):
+    name: str
+    # None - MINVALUE/MAXVALUE
+    lower: Optional[datetime]
+    upper: Optional[datetime]
+
+
+class MonthlyPartitions:
+    """
+    Помесячные range-секции таблицы, секционированной по колонке времени:
+    заранее создает будущие секции и отсоединяет старые вместо массового DELETE
+    """
+
+    bound_pattern = re.compile(r"FROM \((.+?)\) TO \((.+?)\)")
+
+    def __init__(
+        self,
+        session_manager: SessionManager,
+        table: str = "posts",
+        months_ahead: int = 3,
+        logger: logging.Logger = logging,
+    ) -> None:
+        self.table = table
+        self.months_ahead = months_ahead
+        self.logger = logger
+        self.engine = session_manager.autocommit_engine
+
+    @staticmethod
+    def _bound(value: str) -> Optional[datetime]:
+        value = value.strip("'")
+        if value in ("MINVALUE", "MAXVALUE"):
+            return None
+        return datetime.fromisoformat(value)
+
+    async def partitions(self) -> List[Partition]:
+        query = text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:table AS regclass)"
+        )
+        async with self.engine.connect() as connection:
+            rows = (await connection.execute(query, {"table": self.table})).all()
+        partitions = []
+        for name, bound in rows:
+            if match := self.bound_pattern.search(bound):
+                lower, upper = match.groups()
+                partitions.append(
+                    Partition(name, self._bound(lower), self._bound(upper))
+                )
+        return sorted(partitions, key=lambda item: item.lower or datetime.min)
+
+    async def ensure(self, today: Optional[date] = None) -> List[str]:
+        """
+        Создать недостающие секции с текущего месяца на months_ahead вперед
+        """
+        existing = await self.partitions()
+        current = month_start(today or date.today())
+        created = []
+        for offset in range(self.months_ahead + 1):
+            start = add_months(current, offset)
+            moment = datetime(start.year, start.month, 1)
+            if any(
+                (item.lower is None or item.lower <= moment)
+                and (item.upper is None or moment < item.upper)
+                for item in existing
+            ):
+                continue
+            name = f"{self.table}_p{start:%Y_%m}"
+            async with self.engine.connect() as connection:
+                await connection.execute(
+                    text(
+                        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {self.table} "
+                        f"FOR VALUES FROM ('{start}') TO ('{add_months(start, 1)}')"
+                    )
+                )
+            created.append(name)
+            self.logger.info(f"Создана секция {name}")
+        return created
+
+    async def detach_older_than(self, cutoff: date) -> List[str]:
+        """
+        Отсоединить секции, целиком лежащие раньше cutoff. Они остаются
+        отдельными таблицами: их можно выгрузить в архив и удалить DROP TABLE.
+        Строки post_authors отсоединенных постов не удаляются: пост в архиве
+        по-прежнему считается постом профиля
+        """
+        moment = datetime(cutoff.year, cutoff.month, cutoff.day)
+        detached = []
+        for partition in await self.partitions():
+            if partition.upper is None or partition.upper > moment:
+                continue
+            # CONCURRENTLY не блокирует чтение и запись в родительскую таблицу
+            async with self.engine.connect() as connection:
+                await connection.execute(
+                    text(
+                        f"ALTER TABLE {self.table} "
+                        f"DETACH PARTITION {partition.name} CONCURRENTLY"
+                    )
+                )
+            detached.append(partition.name)
+            self.logger.info(f"Секция {partition.name} отсоединена")
+        return detached
@@ -0,0 +1,79 @@
+from contextvars import ContextVar
+from typing import Awaitable, Callable, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, async_sessionmaker
+
+current_unit_of_work: ContextVar[Optional["UnitOfWork"]] = ContextVar(
+    "current_unit_of_work", default=None
+)
+
+
+class UnitOfWork:
+    """
+    Одно соединение и одна транзакция на запрос или сообщение.
+    Сессии регистров, открытые внутри, привязываются к этому соединению,
+    их commit не завершает транзакцию - она фиксируется при выходе из блока.
+    Вложенные async with того же объекта присоединяются к внешнему
+    """
+
+    def __init__(self, engine: AsyncEngine) -> None:
+        self.engine = engine
+        self.connection: Optional[AsyncConnection] = None
+        self._depth = 0
+        self._token = None
+        self._after_commit: List[Callable[[], Awaitable]] = []
+
+    async def __aenter__(self) -> "UnitOfWork":
+        self._depth += 1
+        if self._depth == 1:
+            self.connection = await self.engine.connect()
+            await self.connection.begin()
+            self._token = current_unit_of_work.set(self)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self._depth -= 1
+        if self._depth:
+            return
+        callbacks, self._after_commit = self._after_commit, []
+        try:
+            if exc_type is None:
+                await self.connection.commit()
+            else:
+                await self.connection.rollback()
+        finally:
+            current_unit_of_work.reset(self._token)
+            await self.connection.close()
+            self.connection = self._token = None
+        if exc_type is None:
+            for callback in callbacks:
+                await callback()
+
+    def after_commit(self, callback: Callable[[], Awaitable]) -> None:
+        self._after_commit.append(callback)
+
+
+async def run_after_commit(callback: Callable[[], Awaitable]) -> None:
+    """
+    Выполнить действие после фиксации текущей единицы работы или сразу,
+    если ее нет
+    """
+    if (unit_of_work := current_unit_of_work.get()) is None:
+        await callback()
+    else:
+        unit_of_work.after_commit(callback)
+
+
+class JoiningSessionFactory:
+    """
+    Фабрика сессий, которая внутри единицы работы открывает сессию
+    на ее соединении вместо нового соединения из пула
+    """
+
+    def __init__(self, factory: async_sessionmaker) -> None:
+        self.factory = factory
+
+    def __call__(self, **kwargs):
+        if (unit_of_work := current_unit_of_work.get()) is not None:
+            kwargs.setdefault("bind", unit_of_work.connection)
+        return self.factory(**kwargs)
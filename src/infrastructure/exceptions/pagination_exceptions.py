@@ -0,0 +1,18 @@
+from fastapi import status
+
+from infrastructure.base_entities.base_exception import BaseAPIException
+
+
+class InvalidCursor(BaseAPIException):
+    message = "Cursor is malformed or does not match the requested ordering"
+    status_code = status.HTTP_400_BAD_REQUEST
+
+
+class UnsupportedSortField(BaseAPIException):
+    message = "Sorting by this field is not supported"
+    status_code = status.HTTP_400_BAD_REQUEST
+
+
+class UnsupportedProjectionField(BaseAPIException):
+    message = "Selecting this field is not supported"
+    status_code = status.HTTP_400_BAD_REQUEST
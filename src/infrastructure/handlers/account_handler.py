@@ -5,6 +5,7 @@ import orjson
 from application.container import Container
 from domain.profile.registry import ProfileReadRegistry, ProfileWriteRegistry
 from domain.profile.schema import CreateProfile
+from infrastructure.database.alchemy_gateway import SessionManager
 
 
 async def create_profile_on_message(raw_message: Any) -> None:
@@ -21,6 +22,17 @@ async def handle_user_data(
     message: dict,
     read_profile: ProfileReadRegistry = Container.profile_read_registry(),
     write_profile: ProfileWriteRegistry = Container.profile_write_registry(),
+    session_manager: SessionManager = Container.alchemy_manager(),
+) -> None:
+    # Чтение и запись по сообщению идут одной транзакцией на одном соединении
+    async with session_manager.unit_of_work():
+        await _apply_user_data(message, read_profile, write_profile)
+
+
+async def _apply_user_data(
+    message: dict,
+    read_profile: ProfileReadRegistry,
+    write_profile: ProfileWriteRegistry,
 ) -> None:
     # TODO: немного допилить логику, иногда консумер валится
     existing_profile = await read_profile.get_by_user_uuid(
@@ -1,5 +1,6 @@
 import asyncio
 import logging
+import time
 from asyncio import (
     AbstractEventLoop,
     Semaphore,
@@ -15,21 +16,52 @@ from typing import Any, Awaitable, Coroutine, Optional, Union
 import redis
 from tenacity import retry, wait_random
 
+from infrastructure.handlers.circuit_breaker import CircuitBreaker
+
 
 async def run_with_timeout(
     coro: Coroutine[Any, Any, Any],
     timeout: int | float,
     operation_name: str = "Имя операции не указано",
     logger: logging.Logger = logging,
+    breaker: Optional[CircuitBreaker] = None,
 ) -> Any:
+    if breaker is not None and not breaker.allow():
+        coro.close()
+        return None
+    started = time.monotonic()
     try:
-        return await asyncio.wait_for(coro, timeout=timeout)
+        result = await asyncio.wait_for(coro, timeout=timeout)
     except (TimeoutError, redis.TimeoutError, asyncio.TimeoutError):
         logger.warning(f"Таймаут ожидания операции {operation_name!r}")
+        if breaker is not None:
+            breaker.record(success=False)
         return None
+    except asyncio.CancelledError:
+        # Иначе пробный вызов half_open не вернет результат и размыкатель
+        # останется без проб
+        if breaker is not None:
+            breaker.record(success=False)
+        raise
     except Exception as error:
         logger.error(f"Ошибка выполнения операции {operation_name!r}: {error}")
+        if breaker is not None:
+            breaker.record(success=False)
         return None
+    if breaker is not None:
+        breaker.record(success=True, duration=time.monotonic() - started)
+    return result
+
+
+_background_tasks: set = set()
+
+
+def fire_and_forget(coro: Coroutine[Any, Any, Any]) -> asyncio.Task:
+    # Держим ссылку на задачу, иначе сборщик мусора может снять ее до завершения
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
 
 
 async def run_with_semaphore(semaphore: Semaphore, coro):
@@ -0,0 +1,99 @@
+import logging
+import time
+from collections import Counter, deque
+from typing import Any, Dict
+
+
+class CircuitBreaker:
+    """
+    Размыкатель для внешней зависимости: после серии ошибок или медленных вызовов
+    вызовы не выполняются open_timeout секунд, затем пропускаются пробные
+    """
+
+    closed = "closed"
+    open = "open"
+    half_open = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        slow_call_duration: float = 0.05,
+        window_size: int = 50,
+        min_calls: int = 10,
+        open_timeout: float = 5,
+        half_open_calls: int = 3,
+        logger: logging.Logger = logging,
+    ) -> None:
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_duration = slow_call_duration
+        self.min_calls = min_calls
+        self.open_timeout = open_timeout
+        self.half_open_calls = half_open_calls
+        self.logger = logger
+        self.state = self.closed
+        # Время перехода в open или half_open
+        self.changed_at = 0.0
+        self.counters = Counter()
+        self._window: deque = deque(maxlen=window_size)
+        self._probes = 0
+        self._probe_successes = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == self.open and not self._cooled_down()
+
+    def _cooled_down(self) -> bool:
+        return time.monotonic() - self.changed_at >= self.open_timeout
+
+    def allow(self) -> bool:
+        if self.state == self.open and self._cooled_down():
+            self._transition(self.half_open)
+        elif (
+            self.state == self.half_open
+            and self._probes >= self.half_open_calls
+            and self._cooled_down()
+        ):
+            # Пробные вызовы за open_timeout так и не отчитались (например, их
+            # отменили) - размыкаемся снова, чтобы через open_timeout пробовать
+            self._transition(self.open)
+        if self.state == self.closed:
+            return True
+        if self.state == self.half_open and self._probes < self.half_open_calls:
+            self._probes += 1
+            return True
+        self.counters["rejected"] += 1
+        return False
+
+    def record(self, success: bool, duration: float = 0) -> None:
+        failed = not success or duration > self.slow_call_duration
+        self.counters["failures" if failed else "successes"] += 1
+        if self.state == self.half_open:
+            if failed:
+                self._transition(self.open)
+            else:
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_calls:
+                    self._transition(self.closed)
+            return
+        if self.state != self.closed:
+            return
+        self._window.append(failed)
+        if (
+            len(self._window) >= self.min_calls
+            and sum(self._window) / len(self._window) >= self.failure_rate
+        ):
+            self._transition(self.open)
+
+    def _transition(self, state: str) -> None:
+        self.counters[f"{self.state}->{state}"] += 1
+        self.logger.warning(f"Размыкатель {self.name!r}: {self.state} -> {state}")
+        self.state = state
+        self._window.clear()
+        self._probes = self._probe_successes = 0
+        if state in (self.open, self.half_open):
+            self.changed_at = time.monotonic()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"name": self.name, "state": self.state, **self.counters}
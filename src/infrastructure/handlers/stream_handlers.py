@@ -0,0 +1,10 @@
+from typing import Any, AsyncIterator, Mapping, Sequence
+
+import orjson
+
+
+async def to_ndjson(
+    partitions: AsyncIterator[Sequence[Mapping[str, Any]]],
+) -> AsyncIterator[bytes]:
+    async for partition in partitions:
+        yield b"".join(orjson.dumps(dict(row)) + b"\n" for row in partition)
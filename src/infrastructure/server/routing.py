@@ -0,0 +1,142 @@
+import functools
+import inspect
+import types
+from collections.abc import Mapping, Sequence
+from typing import Any, Callable, Dict, Optional, Union, get_args, get_origin
+
+import orjson
+from fastapi import Response
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.dependencies.utils import get_typed_return_annotation
+from fastapi.responses import ORJSONResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def render_json(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z)
+
+
+def response_shape(annotation: Any) -> Optional[Dict[str, Any]]:
+    """
+    Поля, которые response_model пропускает в ответ: {имя поля: форма вложенного
+    значения}. None - значение отдается как есть
+    """
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return {
+            name: response_shape(field.annotation)
+            for name, field in annotation.model_fields.items()
+        }
+    origin, args = get_origin(annotation), get_args(annotation)
+    if origin in (Union, types.UnionType):
+        shapes = [
+            shape
+            for arg in args
+            if arg is not type(None) and (shape := response_shape(arg)) is not None
+        ]
+        return shapes[0] if len(shapes) == 1 else None
+    if isinstance(origin, type) and issubclass(origin, Sequence) and args:
+        return response_shape(args[0])
+    return None
+
+
+def apply_shape(content: Any, shape: Optional[Dict[str, Any]]) -> Any:
+    """
+    Оставить в ответе только поля response_model, без повторной валидации
+    """
+    if shape is None or content is None:
+        return content
+    if isinstance(content, BaseModel):
+        content = dict(content)
+    if isinstance(content, Mapping):
+        return {
+            name: apply_shape(value, shape[name])
+            for name, value in content.items()
+            if name in shape
+        }
+    if isinstance(content, (list, tuple)):
+        return [apply_shape(item, shape) for item in content]
+    return content
+
+
+class ORJSONRoute(APIRoute):
+    """
+    Маршрут, который сам сериализует ответ через orjson.
+    Модели и строки из БД уже проверены сервисом, поэтому повторная валидация
+    через response_model пропускается: из ответа только убираются поля, которых
+    нет в response_model. Маршруты с response_model_include/exclude/exclude_*
+    и ответы, которые не сериализуются (например, ORM-объекты), идут обычным путем
+    """
+
+    response_param = "_orjson_route_response"
+    model_options = (
+        "response_model_include",
+        "response_model_exclude",
+        "response_model_exclude_unset",
+        "response_model_exclude_defaults",
+        "response_model_exclude_none",
+    )
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs: Any) -> None:
+        if isinstance(kwargs.get("response_class"), DefaultPlaceholder):
+            kwargs["response_class"] = ORJSONResponse
+        if not any(kwargs.get(option) for option in self.model_options):
+            response_model = kwargs.get("response_model")
+            if isinstance(response_model, DefaultPlaceholder):
+                response_model = get_typed_return_annotation(endpoint)
+            endpoint = self._render(
+                endpoint, kwargs.get("status_code"), response_shape(response_model)
+            )
+        super().__init__(path, endpoint, **kwargs)
+
+    @classmethod
+    def _render(
+        cls,
+        endpoint: Callable,
+        status_code: Any,
+        shape: Optional[Dict[str, Any]] = None,
+    ) -> Callable:
+        # include_router пересоздает маршрут с уже обернутым эндпоинтом
+        if cls.response_param in inspect.signature(endpoint).parameters:
+            return endpoint
+
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            sub_response: Response = kwargs.pop(cls.response_param)
+            content = await endpoint(*args, **kwargs)
+            if isinstance(content, Response):
+                return content
+            try:
+                body = render_json(apply_shape(content, shape))
+            except (orjson.JSONEncodeError, TypeError):
+                return content
+            response = Response(
+                content=body,
+                status_code=sub_response.status_code or status_code or 200,
+                media_type="application/json",
+            )
+            # Заголовки, выставленные зависимостями, FastAPI сам не переносит
+            # в ответ, возвращенный эндпоинтом
+            response.headers.raw.extend(sub_response.headers.raw)
+            return response
+
+        signature = inspect.signature(endpoint)
+        wrapper.__signature__ = signature.replace(
+            parameters=[
+                *signature.parameters.values(),
+                inspect.Parameter(
+                    cls.response_param,
+                    inspect.Parameter.KEYWORD_ONLY,
+                    annotation=Response,
+                ),
+            ]
+        )
+        return wrapper
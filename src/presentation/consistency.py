@@ -0,0 +1,24 @@
+from typing import Optional
+
+from fastapi import Depends, Header, Request, Response
+
+from application.container import Container
+from infrastructure.database.alchemy_gateway import SessionManager
+
+consistency_header = "X-Consistency-Token"
+
+
+async def read_your_writes(
+    request: Request,
+    response: Response,
+    token: Optional[str] = Header(None, alias=consistency_header),
+    session_manager: SessionManager = Depends(Container.alchemy_manager),
+) -> None:
+    """
+    Изменяющие запросы возвращают токен в заголовке, чтения с этим токеном
+    обслуживаются primary, пока токен не истек
+    """
+    if token:
+        session_manager.accept_token(token)
+    if request.method not in ("GET", "HEAD"):
+        response.headers[consistency_header] = session_manager.issue_token()
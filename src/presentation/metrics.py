@@ -0,0 +1,23 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends
+
+from application.container import Container
+from infrastructure.cache.redis_cache import RedisCache
+from infrastructure.database.alchemy_gateway import SessionManager
+
+
+class MetricsRouter:
+    api_router = APIRouter(prefix="/metrics", tags=["Metrics"])
+    cache_client: RedisCache = Depends(Container.redis_cache)
+    session_manager: SessionManager = Depends(Container.alchemy_manager)
+
+    @staticmethod
+    @api_router.get("/cache")
+    async def cache(cache=cache_client) -> Dict[str, Any]:
+        return cache.stats()
+
+    @staticmethod
+    @api_router.get("/pool")
+    async def pool(manager=session_manager) -> Dict[str, Any]:
+        return manager.pool_stats()
@@ -1,16 +1,34 @@
 import asyncio
-from typing import List
+from datetime import datetime
+from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Body, Depends, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from domain.post.schema import CreatePost, GetPostByUUID, PostReturnData
+from domain.post.schema import (
+    BulkPostReturnData,
+    CreatePost,
+    GetPostByUUID,
+    PostPage,
+    PostReturnData,
+    PostSearchPage,
+    TrendingHashtag,
+)
+from infrastructure.base_entities.base_model import BaseResultModel
+from infrastructure.server.routing import ORJSONRoute
+from presentation.consistency import read_your_writes
 from service.post_service import PostReadService, PostWriteService
 
 
 class PostRouter:
-    api_router = APIRouter(prefix="/post", tags=["Post"])
+    api_router = APIRouter(
+        prefix="/post",
+        tags=["Post"],
+        dependencies=[Depends(read_your_writes)],
+        route_class=ORJSONRoute,
+    )
     output_model: BaseModel = PostReturnData
     input_model: BaseModel = CreatePost
     read_service_client: PostReadService = Depends(PostReadService)
@@ -20,17 +38,84 @@ class PostRouter:
     @api_router.get("/one", response_model=output_model)
     async def get(
         user_uuid: str | UUID,
+        created_at: Optional[datetime] = None,
         service=read_service_client,
     ) -> output_model:
-        return await service.get(cmd=GetPostByUUID(uuid=user_uuid))
+        # created_at - необязательная подсказка: пост ищется в одной секции
+        return await service.get(
+            cmd=GetPostByUUID(uuid=user_uuid), created_at=created_at
+        )
+
+    @staticmethod
+    @api_router.get("/many", response_model=List[Optional[output_model]])
+    async def get_many(
+        uuids: List[UUID] = Query(min_length=1, max_length=500),
+        service=read_service_client,
+    ) -> List[Optional[output_model]]:
+        return await service.get_many(post_uuids=uuids)
 
     @staticmethod
-    @api_router.get("/all", response_model=List[output_model])
+    @api_router.get("/all", response_model=PostPage)
     async def get_list(
         parameter: str = "created_at",
+        limit: int = Query(default=50, ge=1, le=500),
+        cursor: Optional[str] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
         service=read_service_client,
-    ) -> List[output_model]:
-        return await service.get_list(parameter=parameter)
+    ) -> PostPage:
+        return await service.get_list(
+            parameter=parameter,
+            limit=limit,
+            cursor=cursor,
+            created_after=created_after,
+            created_before=created_before,
+        )
+
+    @staticmethod
+    @api_router.get("/feed", response_model=PostPage)
+    async def feed(
+        profile_uuid: UUID,
+        limit: int = Query(default=20, ge=1, le=100),
+        cursor: Optional[str] = None,
+        service=read_service_client,
+    ) -> PostPage:
+        return await service.feed(profile_uuid=profile_uuid, limit=limit, cursor=cursor)
+
+    @staticmethod
+    @api_router.get("/search", response_model=PostSearchPage)
+    async def search(
+        q: str = Query(min_length=1, max_length=200),
+        limit: int = Query(default=20, ge=1, le=100),
+        cursor: Optional[str] = None,
+        snippets: bool = False,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        service=read_service_client,
+    ) -> PostSearchPage:
+        return await service.search(
+            query=q,
+            limit=limit,
+            cursor=cursor,
+            snippets=snippets,
+            created_after=created_after,
+            created_before=created_before,
+        )
+
+    @staticmethod
+    @api_router.get("/trending", response_model=List[TrendingHashtag])
+    async def trending(
+        limit: int = Query(default=10, ge=1, le=100),
+        service=read_service_client,
+    ) -> List[TrendingHashtag]:
+        return await service.trending_hashtags(limit=limit)
+
+    @staticmethod
+    @api_router.get("/export", response_class=StreamingResponse)
+    async def export(
+        service=read_service_client,
+    ) -> StreamingResponse:
+        return StreamingResponse(service.export(), media_type="application/x-ndjson")
 
     @staticmethod
     @api_router.post("/create", response_model=output_model)
@@ -40,6 +125,14 @@ class PostRouter:
     ) -> output_model:
         return await service.create(data=incoming_data)
 
+    @staticmethod
+    @api_router.post("/bulk", response_model=BulkPostReturnData)
+    async def bulk_create(
+        incoming_data: List[input_model] = Body(min_length=1, max_length=10000),
+        service=write_service_client,
+    ) -> BulkPostReturnData:
+        return await service.bulk_create(data=incoming_data)
+
     @staticmethod
     @api_router.patch("/update{user_uuid}", response_model=output_model)
     async def update(
@@ -58,3 +151,11 @@ class PostRouter:
         service=write_service_client,
     ) -> output_model:
         return await service.delete(post_uuid=GetPostByUUID(uuid=user_uuid))
+
+    @staticmethod
+    @api_router.post("/like", response_model=BaseResultModel)
+    async def like(
+        user_uuid: str | UUID,
+        service=write_service_client,
+    ) -> BaseResultModel:
+        return await service.like(post_uuid=GetPostByUUID(uuid=user_uuid))
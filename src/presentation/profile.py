@@ -2,21 +2,32 @@ import asyncio
 from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, UploadFile
+from fastapi import APIRouter, Depends, Query, UploadFile
+from fastapi.responses import StreamingResponse
 from fastapi_filter import FilterDepends
 from pydantic import BaseModel
 
 from domain.profile.schema import (
     CreateProfile,
+    FriendReturnData,
+    FriendSuggestion,
     GetProfileByUUID,
     ProfileFilter,
+    ProfilePage,
     ProfileReturnData,
 )
+from infrastructure.server.routing import ORJSONRoute
+from presentation.consistency import read_your_writes
 from service.profile_service import ProfileReadService, ProfileWriteService
 
 
 class ProfileRouter:
-    api_router = APIRouter(prefix="/profile", tags=["Profile"])
+    api_router = APIRouter(
+        prefix="/profile",
+        tags=["Profile"],
+        dependencies=[Depends(read_your_writes)],
+        route_class=ORJSONRoute,
+    )
     output_model: BaseModel = ProfileReturnData
     input_model: BaseModel = CreateProfile
     filters: ProfileFilter = FilterDepends(ProfileFilter)
@@ -32,20 +43,51 @@ class ProfileRouter:
         return await service.get(cmd=GetProfileByUUID(uuid=user_uuid))
 
     @staticmethod
-    @api_router.get("/find", response_model=List[output_model])
+    @api_router.get("/many", response_model=List[Optional[output_model]])
+    async def get_many(
+        uuids: List[UUID] = Query(min_length=1, max_length=500),
+        service=read_service_client,
+    ) -> List[Optional[output_model]]:
+        return await service.get_many(prof_uuids=uuids)
+
+    @staticmethod
+    @api_router.get("/find", response_model=ProfilePage)
     async def find(
         filters=filters,
         service=read_service_client,
-    ) -> output_model:
+    ) -> ProfilePage:
         return await service.find(filters=filters)
 
     @staticmethod
-    @api_router.get("/all", response_model=List[output_model])
+    @api_router.get("/all", response_model=ProfilePage)
     async def get_list(
         parameter: str = "created_at",
+        limit: int = Query(default=50, ge=1, le=500),
+        cursor: Optional[str] = None,
+        fields: Optional[str] = None,
+        service=read_service_client,
+    ) -> ProfilePage:
+        return await service.get_list(
+            parameter=parameter,
+            limit=limit,
+            cursor=cursor,
+            fields=[field.strip() for field in fields.split(",")] if fields else None,
+        )
+
+    @staticmethod
+    @api_router.get("/export", response_class=StreamingResponse)
+    async def export(
+        fields: Optional[str] = None,
         service=read_service_client,
-    ) -> List[output_model]:
-        return await service.get_list(parameter=parameter)
+    ) -> StreamingResponse:
+        return StreamingResponse(
+            service.export(
+                fields=(
+                    [field.strip() for field in fields.split(",")] if fields else None
+                )
+            ),
+            media_type="application/x-ndjson",
+        )
 
     @staticmethod
     @api_router.post("/create", response_model=output_model)
@@ -74,3 +116,45 @@ class ProfileRouter:
         service=write_service_client,
     ) -> output_model:
         return await service.delete(prof_uuid=GetProfileByUUID(uuid=user_uuid))
+
+    @staticmethod
+    @api_router.post("/friend", response_model=FriendReturnData)
+    async def make_friend(
+        profile_uuid: UUID,
+        friend_uuid: UUID,
+        service=write_service_client,
+    ) -> FriendReturnData:
+        return await service.make_friend(
+            profile_uuid=profile_uuid, friend_uuid=friend_uuid
+        )
+
+    @staticmethod
+    @api_router.delete("/friend", response_model=Optional[FriendReturnData])
+    async def remove_friend(
+        profile_uuid: UUID,
+        friend_uuid: UUID,
+        service=write_service_client,
+    ) -> Optional[FriendReturnData]:
+        return await service.remove_friend(
+            profile_uuid=profile_uuid, friend_uuid=friend_uuid
+        )
+
+    @staticmethod
+    @api_router.get("/friends/mutual", response_model=List[UUID])
+    async def mutual_friends(
+        profile_uuid: UUID,
+        other_uuid: UUID,
+        service=read_service_client,
+    ) -> List[UUID]:
+        return await service.mutual_friends(
+            profile_uuid=profile_uuid, other_uuid=other_uuid
+        )
+
+    @staticmethod
+    @api_router.get("/friends/suggestions", response_model=List[FriendSuggestion])
+    async def friends_of_friends(
+        profile_uuid: UUID,
+        limit: int = Query(default=20, ge=1, le=100),
+        service=read_service_client,
+    ) -> List[FriendSuggestion]:
+        return await service.friends_of_friends(profile_uuid=profile_uuid, limit=limit)
@@ -1,43 +1,278 @@
-from typing import List, Optional
+import logging
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+from uuid import UUID
 
 from fastapi import Depends
 
 from application.container import Container
 from domain.post.registry import PostReadRegistry, PostWriteRegistry
-from domain.post.schema import CreatePost, GetPostByUUID, PostReturnData
+from domain.post.schema import (
+    BulkItemStatus,
+    BulkPostReturnData,
+    CreatePost,
+    GetPostByUUID,
+    PostPage,
+    PostReturnData,
+    PostSearchPage,
+    TrendingHashtag,
+)
+from domain.profile.registry import ProfileReadRegistry
+from infrastructure.base_entities.base_model import BaseResultModel
+from infrastructure.base_entities.base_pagination import KeysetPagination
+from infrastructure.cache.likes_counter import LikesCounter
+from infrastructure.cache.redis_cache import RedisCache
+from infrastructure.cache.timeline_cache import TimelineCache
+from infrastructure.cache.trending_index import TrendingIndex
+from infrastructure.exceptions.pagination_exceptions import InvalidCursor
 from infrastructure.exceptions.profile_exceptions import PostNotFound
+from infrastructure.handlers.asyncio_handlers import fire_and_forget
+from infrastructure.handlers.stream_handlers import to_ndjson
 
 
 class PostReadService:
     def __init__(
         self,
         read_repository: PostReadRegistry = Depends(Container.post_read_registry),
+        profile_repository: ProfileReadRegistry = Depends(
+            Container.profile_read_registry
+        ),
+        cache_repository: RedisCache = Depends(Container.redis_cache),
+        trending_index: TrendingIndex = Depends(Container.trending_index),
+        timeline_cache: TimelineCache = Depends(Container.timeline_cache),
     ):
         self.read_repo = read_repository
+        self.profile_repo = profile_repository
+        self.cache = cache_repository
+        self.trending = trending_index
+        self.timeline = timeline_cache
+
+    async def get(
+        self, cmd: GetPostByUUID, created_at: Optional[datetime] = None
+    ) -> Optional[PostReturnData]:
+        return await self.cache.cache(
+            ttl=60,
+            timeout=0.1,
+            tags=[f"post:{cmd.uuid}"],
+            key=f"post:{cmd.uuid}",
+            func=self._load,
+            post_uuid=cmd.uuid,
+            created_at=created_at,
+        )
+
+    async def _load(
+        self, post_uuid: UUID, created_at: Optional[datetime] = None
+    ) -> Optional[PostReturnData]:
+        if created_at is not None:
+            # Подсказка сужает поиск до одной секции. Неверная подсказка не
+            # должна закрепить в кеше отсутствие поста, поэтому промах
+            # перепроверяется по всем секциям
+            if found := await self._load_many([post_uuid], created_at=created_at):
+                return found.get(post_uuid)
+        return (await self._load_many([post_uuid])).get(post_uuid)
+
+    async def get_many(
+        self, post_uuids: List[UUID], track: bool = True
+    ) -> List[Optional[PostReturnData]]:
+        found = await self.cache.cache_many(
+            func=self._load_many,
+            ids=post_uuids,
+            prefix="post",
+            ttl=60,
+            timeout=0.1,
+            track=track,
+        )
+        return [found.get(post_uuid) for post_uuid in post_uuids]
+
+    async def _load_many(
+        self, post_uuids: List[UUID], created_at: Optional[datetime] = None
+    ) -> Dict[UUID, PostReturnData]:
+        # Строки из БД уже нужных типов, поэтому модель собирается без валидации
+        found = {
+            row["uuid"]: PostReturnData.model_construct(**row)
+            for row in await self.read_repo.get_many_rows(
+                post_uuids=post_uuids, primary=True, created_at=created_at
+            )
+        }
+        return found
+
+    async def get_list(
+        self,
+        parameter: str,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+    ) -> PostPage:
+        items, next_cursor = await self.read_repo.get_list(
+            parameter=parameter,
+            limit=limit,
+            cursor=cursor,
+            created_after=created_after,
+            created_before=created_before,
+        )
+        return {"items": items, "next_cursor": next_cursor}
 
-    async def get(self, cmd: GetPostByUUID) -> Optional[PostReturnData]:
-        return await self.read_repo.get(post_uuid=cmd.uuid)
+    async def search(
+        self,
+        query: str,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        snippets: bool = False,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+    ) -> PostSearchPage:
+        items, next_cursor = await self.read_repo.search(
+            query=query,
+            limit=limit,
+            cursor=cursor,
+            snippets=snippets,
+            created_after=created_after,
+            created_before=created_before,
+        )
+        return {"items": items, "next_cursor": next_cursor}
+
+    async def feed(
+        self, profile_uuid: UUID, limit: int, cursor: Optional[str] = None
+    ) -> PostPage:
+        before = before_uuid = None
+        if cursor:
+            try:
+                before, before_uuid = KeysetPagination.load_cursor(cursor, "feed")
+                before, before_uuid = float(before), UUID(before_uuid)
+            except (TypeError, ValueError, AttributeError):
+                raise InvalidCursor
+        entries = dict(
+            await self.timeline.read(
+                profile_uuid=profile_uuid,
+                limit=limit,
+                before=before,
+                before_uuid=before_uuid,
+            )
+        )
+        # Посты профилей с большим числом подписчиков не раздаются по лентам,
+        # их добираем при чтении
+        posts = {}
+        if high_degree := await self.timeline.high_degree_profiles():
+            if authors := await self.profile_repo.get_friend_ids(
+                profile_uuid=profile_uuid, among=high_degree
+            ):
+                for post in await self.read_repo.get_recent_by_authors(
+                    profile_uuids=authors,
+                    limit=limit,
+                    before=datetime.fromtimestamp(before) if before else None,
+                    before_uuid=before_uuid,
+                ):
+                    posts[post.uuid] = post
+                    entries[post.uuid] = post.created_at.timestamp()
+        # Порядок (время, uuid) по убыванию совпадает с курсором
+        page = sorted(
+            entries.items(), key=lambda entry: (entry[1], entry[0]), reverse=True
+        )[:limit]
+        if missing := [post_uuid for post_uuid, _ in page if post_uuid not in posts]:
+            for post in await self.read_repo.get_many(post_uuids=missing):
+                posts[post.uuid] = post
+        next_cursor = None
+        if len(page) == limit:
+            last_uuid, last_score = page[-1]
+            next_cursor = KeysetPagination.encode_cursor("feed", last_score, last_uuid)
+        return {
+            "items": [posts[post_uuid] for post_uuid, _ in page if post_uuid in posts],
+            "next_cursor": next_cursor,
+        }
+
+    def export(self) -> AsyncIterator[bytes]:
+        return to_ndjson(self.read_repo.stream())
 
-    async def get_list(self, parameter: str) -> Optional[List[PostReturnData]]:
-        return await self.read_repo.get_list(parameter=parameter)
+    async def trending_hashtags(self, limit: int) -> List[TrendingHashtag]:
+        return [
+            TrendingHashtag(hashtag=hashtag, score=score)
+            for hashtag, score in await self.trending.top(limit=limit)
+        ]
 
 
 class PostWriteService:
     def __init__(
         self,
+        read_repository: PostReadRegistry = Depends(Container.post_read_registry),
         write_repository: PostWriteRegistry = Depends(
             Container.post_write_registry,
         ),
+        profile_repository: ProfileReadRegistry = Depends(
+            Container.profile_read_registry
+        ),
+        cache_repository: RedisCache = Depends(Container.redis_cache),
+        likes_counter: LikesCounter = Depends(Container.likes_counter),
+        trending_index: TrendingIndex = Depends(Container.trending_index),
+        timeline_cache: TimelineCache = Depends(Container.timeline_cache),
     ):
+        self.read_repo = read_repository
         self.write_repo = write_repository
+        self.profile_repo = profile_repository
+        self.cache = cache_repository
+        self.likes_counter = likes_counter
+        self.trending = trending_index
+        self.timeline = timeline_cache
 
     async def create(self, data: CreatePost) -> Optional[PostReturnData]:
-        return await self.write_repo.create(cmd=data)
+        post = await self.write_repo.create(cmd=data)
+        fire_and_forget(
+            self.fan_out(
+                profile_uuid=post.profile_id,
+                post_uuid=post.uuid,
+                created_at=post.created_at,
+            )
+        )
+        return post
+
+    async def fan_out(
+        self, profile_uuid: UUID, post_uuid: UUID, created_at: datetime
+    ) -> None:
+        try:
+            threshold = self.timeline.high_degree_threshold
+            followers = await self.profile_repo.get_follower_ids(
+                profile_uuid=profile_uuid, limit=threshold + 1
+            )
+            if len(followers) > threshold:
+                await self.timeline.mark_high_degree(profile_uuid=profile_uuid)
+                followers = []
+            await self.timeline.push(
+                profile_uuids=[profile_uuid, *followers],
+                post_uuid=post_uuid,
+                created_at=created_at,
+            )
+        except Exception as error:
+            logging.error(f"Ошибка раздачи поста {post_uuid} по лентам: {error}")
+
+    async def bulk_create(self, data: List[CreatePost]) -> BulkPostReturnData:
+        created_at = datetime.now()
+        items = await self.write_repo.bulk_create(cmds=data, created_at=created_at)
+        created_items = [
+            item for item in items if item["status"] == BulkItemStatus.created
+        ]
+        for item in created_items:
+            fire_and_forget(
+                self.fan_out(
+                    profile_uuid=data[item["index"]].profile_id,
+                    post_uuid=item["uuid"],
+                    created_at=created_at,
+                )
+            )
+        created = len(created_items)
+        return {"created": created, "failed": len(items) - created, "items": items}
 
     async def update(
         self, data: CreatePost, post_uuid: GetPostByUUID
     ) -> Optional[PostReturnData]:
-        return await self.write_repo.update(cmd=data, post_uuid=post_uuid.uuid)
+        post = await self.write_repo.update(cmd=data, post_uuid=post_uuid.uuid)
+        await self.cache.invalidate_tags(f"post:{post_uuid.uuid}")
+        return post
 
     async def delete(self, post_uuid: GetPostByUUID) -> Optional[PostReturnData]:
-        return await self.write_repo.delete(post_uuid=post_uuid.uuid)
+        post = await self.write_repo.delete(post_uuid=post_uuid.uuid)
+        await self.cache.invalidate_tags(f"post:{post_uuid.uuid}")
+        return post
+
+    async def like(self, post_uuid: GetPostByUUID) -> BaseResultModel:
+        await self.likes_counter.incr(post_uuid=post_uuid.uuid)
+        return BaseResultModel(status=True)
@@ -1,5 +1,7 @@
 import asyncio
-from typing import Any, List, Optional
+from collections import Counter
+from functools import partial
+from typing import AsyncIterator, Dict, List, Optional, Set
 from uuid import UUID
 
 from fastapi import Depends, UploadFile
@@ -7,9 +9,21 @@ from fastapi import Depends, UploadFile
 from application.config import settings
 from application.container import Container
 from domain.profile.registry import ProfileReadRegistry, ProfileWriteRegistry
-from domain.profile.schema import CreateProfile, GetProfileByUUID, ProfileReturnData
+from domain.profile.schema import (
+    CreateProfile,
+    FriendReturnData,
+    FriendSuggestion,
+    GetProfileByUUID,
+    ProfileFilter,
+    ProfilePage,
+    ProfileReturnData,
+)
+from infrastructure.cache.friend_graph import FriendGraphCache
 from infrastructure.cache.redis_cache import RedisCache
+from infrastructure.cache.table_versions import TableVersions
+from infrastructure.database.unit_of_work import UnitOfWork, run_after_commit
 from infrastructure.exceptions.profile_exceptions import FriendAlreadyExist
+from infrastructure.handlers.stream_handlers import to_ndjson
 
 
 class ProfileReadService:
@@ -17,21 +31,122 @@ class ProfileReadService:
         self,
         read_repository: ProfileReadRegistry = Depends(Container.profile_read_registry),
         cache_repository: RedisCache = Depends(Container.redis_cache),
+        friend_graph: FriendGraphCache = Depends(Container.friend_graph),
+        table_versions: TableVersions = Depends(Container.table_versions),
     ):
         self.read_repo = read_repository
         self.cache = cache_repository
+        self.graph = friend_graph
+        self.versions = table_versions
 
     async def get(self, cmd: GetProfileByUUID) -> Optional[ProfileReturnData]:
         profile = await self.cache.cache(
-            ttl=660, timeout=0.1, func=self.read_repo.get, prof_uuid=cmd.uuid
+            ttl=660,
+            timeout=0.1,
+            stale_ttl=60,
+            lock_ttl=1,
+            tags=[f"profile:{cmd.uuid}"],
+            key=f"profile:{cmd.uuid}",
+            func=self._load,
+            prof_uuid=cmd.uuid,
         )
         return profile
 
-    async def get_list(self, parameter: str) -> Optional[List[ProfileReturnData]]:
-        return await self.read_repo.get_list(parameter=parameter)
+    async def _load(self, prof_uuid: UUID) -> Optional[ProfileReturnData]:
+        return (await self._load_many([prof_uuid])).get(prof_uuid)
 
-    async def find(self, filters: Any = None):
-        return await self.read_repo.find(filters=filters)
+    async def get_many(
+        self, prof_uuids: List[UUID], track: bool = True
+    ) -> List[Optional[ProfileReturnData]]:
+        found = await self.cache.cache_many(
+            func=self._load_many,
+            ids=prof_uuids,
+            prefix="profile",
+            ttl=660,
+            timeout=0.1,
+            track=track,
+        )
+        return [found.get(prof_uuid) for prof_uuid in prof_uuids]
+
+    async def _load_many(self, prof_uuids: List[UUID]) -> Dict[UUID, ProfileReturnData]:
+        # Строки из БД уже нужных типов, поэтому модель собирается без валидации
+        found = {
+            row["uuid"]: ProfileReturnData.model_construct(**row)
+            for row in await self.read_repo.get_many_rows(
+                prof_uuids=prof_uuids, primary=True
+            )
+        }
+        return found
+
+    async def get_list(
+        self,
+        parameter: str,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+    ) -> ProfilePage:
+        items, next_cursor = await self.read_repo.get_list(
+            parameter=parameter, limit=limit, cursor=cursor, fields=fields
+        )
+        return {"items": items, "next_cursor": next_cursor}
+
+    async def find(self, filters: Optional[ProfileFilter] = None) -> ProfilePage:
+        filters = filters or ProfileFilter()
+        table = self.read_repo.model.__tablename__
+        if (versions := await self.versions.get(table)) is None:
+            items, next_cursor = await self.read_repo.find(filters=filters)
+        else:
+            # Версия таблицы в ключе: после любой записи старые результаты не читаются.
+            # Запрос идет на primary: отстающая реплика вернула бы данные до записи,
+            # и они закрепились бы в кеше под новой версией
+            items, next_cursor = await self.cache.cache(
+                ttl=60,
+                timeout=0.1,
+                key=f"find:{table}:v{versions[table]}:{filters.cache_key()}",
+                func=self.read_repo.find,
+                filters=filters,
+                primary=True,
+            )
+        return {"items": items, "next_cursor": next_cursor}
+
+    def export(self, fields: Optional[List[str]] = None) -> AsyncIterator[bytes]:
+        return to_ndjson(self.read_repo.stream(fields=fields))
+
+    async def mutual_friends(self, profile_uuid: UUID, other_uuid: UUID) -> List[UUID]:
+        if await self.graph.ensure(
+            [profile_uuid, other_uuid], loader=self.read_repo.get_friend_ids_many
+        ):
+            if (
+                mutual := await self.graph.intersect(profile_uuid, other_uuid)
+            ) is not None:
+                return sorted(mutual)
+        adjacency = await self.read_repo.get_friend_ids_many([profile_uuid, other_uuid])
+        return sorted(set(adjacency[profile_uuid]) & set(adjacency[other_uuid]))
+
+    async def friends_of_friends(
+        self, profile_uuid: UUID, limit: int, max_friends: int = 200
+    ) -> List[FriendSuggestion]:
+        friends = (await self._adjacency([profile_uuid]))[profile_uuid]
+        # Второй шаг ограничен, чтобы у профилей с тысячами друзей запрос оставался дешевым
+        sample = sorted(friends)[:max_friends]
+        counter = Counter()
+        for second_hop in (await self._adjacency(sample)).values():
+            counter.update(second_hop - friends - {profile_uuid})
+        return [
+            FriendSuggestion(uuid=uuid, mutual_friends=count)
+            for uuid, count in counter.most_common(limit)
+        ]
+
+    async def _adjacency(self, profile_uuids: List[UUID]) -> Dict[UUID, Set[UUID]]:
+        if not profile_uuids:
+            return {}
+        if await self.graph.ensure(
+            profile_uuids, loader=self.read_repo.get_friend_ids_many
+        ):
+            if (cached := await self.graph.members_many(profile_uuids)) is not None:
+                return cached
+        adjacency = await self.read_repo.get_friend_ids_many(profile_uuids)
+        return {uuid: set(friends) for uuid, friends in adjacency.items()}
 
 
 class ProfileWriteService:
@@ -41,12 +156,22 @@ class ProfileWriteService:
         write_repository: ProfileWriteRegistry = Depends(
             Container.profile_write_registry,
         ),
+        cache_repository: RedisCache = Depends(Container.redis_cache),
+        friend_graph: FriendGraphCache = Depends(Container.friend_graph),
+        # Все записи запроса идут одной транзакцией на одном соединении
+        unit_of_work: UnitOfWork = Depends(
+            Container.alchemy_manager().request_unit_of_work
+        ),
     ):
         self.read_repo = read_repository
         self.write_repo = write_repository
+        self.cache = cache_repository
+        self.graph = friend_graph
+        self.uow = unit_of_work
 
     async def create(self, data: CreateProfile) -> Optional[ProfileReturnData]:
-        return await self.write_repo.create(cmd=data)
+        profile = await self.write_repo.create(cmd=data)
+        return profile
 
     async def update(
         self,
@@ -60,16 +185,57 @@ class ProfileWriteService:
                 topic=settings.KAFKA.topics.media_topic,
             ),
         )
-        return await self.write_repo.update(cmd=data, prof_uuid=prof_uuid.uuid)
+        profile = await self.write_repo.update(cmd=data, prof_uuid=prof_uuid.uuid)
+        await self._invalidate(prof_uuid.uuid)
+        return profile
 
     async def delete(self, prof_uuid: GetProfileByUUID) -> Optional[ProfileReturnData]:
-        return await self.write_repo.delete(prof_uuid=prof_uuid.uuid)
+        profile = await self.write_repo.delete(prof_uuid=prof_uuid.uuid)
+        await self._invalidate(prof_uuid.uuid)
+        return profile
 
-    async def make_friend(self, profile_uuid: UUID, friend_uuid: UUID):
-        if await self.read_repo.check_existing_friend(
-            profile_uuid=profile_uuid, friend_uuid=friend_uuid
-        ):
+    async def _invalidate(self, prof_uuid: UUID) -> None:
+        # До коммита параллельное чтение вернуло бы в кеш старые данные
+        await run_after_commit(
+            partial(self.cache.invalidate_tags, f"profile:{prof_uuid}")
+        )
+
+    async def make_friend(
+        self, profile_uuid: UUID, friend_uuid: UUID
+    ) -> Optional[FriendReturnData]:
+        # Проверка и вставка идут в транзакции запроса
+        if await self._is_friend(profile_uuid=profile_uuid, friend_uuid=friend_uuid):
             raise FriendAlreadyExist
-        return await self.write_repo.add_friend(
+        friend = await self.write_repo.add_friend(
             profile_uuid=profile_uuid, friend_uuid=friend_uuid
         )
+        await run_after_commit(
+            partial(self.graph.add, profile_uuid=profile_uuid, friend_uuid=friend_uuid)
+        )
+        return friend
+
+    async def remove_friend(
+        self, profile_uuid: UUID, friend_uuid: UUID
+    ) -> Optional[FriendReturnData]:
+        friend = await self.write_repo.remove_friend(
+            profile_uuid=profile_uuid, friend_uuid=friend_uuid
+        )
+        await run_after_commit(
+            partial(
+                self.graph.remove, profile_uuid=profile_uuid, friend_uuid=friend_uuid
+            )
+        )
+        return friend
+
+    async def _is_friend(self, profile_uuid: UUID, friend_uuid: UUID) -> bool:
+        if await self.graph.ensure(
+            [profile_uuid], loader=self.read_repo.get_friend_ids_many
+        ):
+            member = await self.graph.is_member(profile_uuid, friend_uuid)
+            if member is not None:
+                return member
+        return bool(
+            await self.read_repo.check_existing_friend(
+                profile_uuid=profile_uuid, friend_uuid=friend_uuid
+            )
+        )
@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+from infrastructure.handlers import circuit_breaker
+from infrastructure.handlers.asyncio_handlers import run_with_timeout
+from infrastructure.handlers.circuit_breaker import CircuitBreaker
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    return clock
+
+
+def make_breaker(**options) -> CircuitBreaker:
+    return CircuitBreaker(
+        name="test",
+        **{"min_calls": 4, "open_timeout": 5, "half_open_calls": 2, **options},
+    )
+
+
+def trip(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.min_calls):
+        assert breaker.allow()
+        breaker.record(success=False)
+
+
+def test_opens_on_failure_rate(clock):
+    breaker = make_breaker()
+    breaker.record(success=True)
+    breaker.record(success=False)
+    breaker.record(success=True)
+    assert breaker.state == breaker.closed
+
+    breaker.record(success=False)
+
+    assert breaker.state == breaker.open
+    assert not breaker.allow()
+    assert breaker.counters["rejected"] == 1
+
+
+def test_slow_calls_count_as_failures(clock):
+    breaker = make_breaker(slow_call_duration=0.05)
+    for _ in range(4):
+        breaker.record(success=True, duration=1)
+
+    assert breaker.state == breaker.open
+
+
+def test_half_open_closes_after_successful_probes(clock):
+    breaker = make_breaker()
+    trip(breaker)
+    clock.now += 5
+
+    assert breaker.allow() and breaker.state == breaker.half_open
+    assert breaker.allow()
+    # Проб не больше half_open_calls
+    assert not breaker.allow()
+    breaker.record(success=True)
+    breaker.record(success=True)
+
+    assert breaker.state == breaker.closed
+
+
+def test_half_open_failure_reopens(clock):
+    breaker = make_breaker()
+    trip(breaker)
+    clock.now += 5
+    assert breaker.allow()
+
+    breaker.record(success=False)
+
+    assert breaker.state == breaker.open
+    assert not breaker.allow()
+
+
+def test_lost_probes_fall_back_to_open(clock):
+    breaker = make_breaker()
+    trip(breaker)
+    clock.now += 5
+    assert breaker.allow() and breaker.allow()
+    assert not breaker.allow()
+
+    clock.now += 5
+    assert not breaker.allow()
+    assert breaker.state == breaker.open
+
+    clock.now += 5
+    assert breaker.allow()
+    assert breaker.state == breaker.half_open
+
+
+@pytest.mark.anyio
+async def test_cancelled_probe_is_recorded_as_failure(clock):
+    breaker = make_breaker(half_open_calls=1)
+    trip(breaker)
+    clock.now += 5
+    task = asyncio.create_task(
+        run_with_timeout(asyncio.sleep(10), timeout=30, breaker=breaker)
+    )
+    await asyncio.sleep(0)
+    assert breaker.state == breaker.half_open
+
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert breaker.state == breaker.open
+
+
+@pytest.mark.anyio
+async def test_run_with_timeout_skips_call_when_open(clock):
+    breaker = make_breaker()
+    trip(breaker)
+    called = False
+
+    async def call():
+        nonlocal called
+        called = True
+
+    assert await run_with_timeout(call(), timeout=1, breaker=breaker) is None
+    assert not called
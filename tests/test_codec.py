@@ -0,0 +1,70 @@
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+
+from domain.post.schema import PostReturnData
+from infrastructure.cache.codec import CacheCodec, CacheCodecError
+
+
+def make_post(**overrides) -> PostReturnData:
+    values = dict(
+        uuid=uuid4(),
+        header="Заголовок",
+        hashtag="#тег",
+        body="Текст " * 200,
+        likes=3,
+        profile_id=uuid4(),
+        created_at=datetime(2026, 10, 18, 12, 30, 15, 123456),
+        updated_at=datetime(2026, 10, 18, 13, 0),
+    )
+    return PostReturnData.model_construct(**(values | overrides))
+
+
+@pytest.mark.parametrize("compression", [None, "zlib"])
+def test_schema_round_trip(compression):
+    codec = CacheCodec(schemas={1: PostReturnData}, compression=compression)
+    post = make_post()
+
+    value, fresh_until = codec.loads_entry(codec.dumps(post, fresh_until=42.5))
+
+    assert isinstance(value, PostReturnData)
+    assert value.model_dump() == post.model_dump()
+    assert fresh_until == 42.5
+
+
+def test_schema_round_trip_keeps_nulls_and_skips_validation():
+    # Строки из БД не обязаны проходить валидаторы схемы записи
+    codec = CacheCodec(schemas={1: PostReturnData})
+    post = make_post(hashtag=None, body=None, likes=None)
+
+    value = codec.loads(codec.dumps(post))
+
+    assert value.hashtag is None and value.body is None and value.likes is None
+    assert value.uuid == post.uuid
+    assert value.created_at == post.created_at
+
+
+def test_json_and_none_round_trip():
+    codec = CacheCodec()
+
+    assert codec.loads(codec.dumps({"items": [1, 2], "next": None})) == {
+        "items": [1, 2],
+        "next": None,
+    }
+    assert codec.loads(codec.dumps(None)) is None
+
+
+def test_changed_schema_is_rejected():
+    raw = CacheCodec(schemas={1: PostReturnData}).dumps(make_post())
+
+    class Changed(PostReturnData):
+        extra: int = 0
+
+    with pytest.raises(CacheCodecError):
+        CacheCodec(schemas={1: Changed}).loads(raw)
+
+
+def test_broken_header_is_rejected():
+    with pytest.raises(CacheCodecError):
+        CacheCodec().loads(b"\x01")
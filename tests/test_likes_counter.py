@@ -0,0 +1,59 @@
+from uuid import uuid4
+
+import pytest
+
+from infrastructure.cache.likes_counter import LikesCounter
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def counter(redis) -> LikesCounter:
+    return LikesCounter(redis=redis)
+
+
+async def test_empty_drain(counter):
+    batch = await counter.drain()
+
+    assert batch.batch_id is None
+    assert batch.deltas == {}
+
+
+async def test_drain_and_ack(counter):
+    first, second = str(uuid4()), str(uuid4())
+    await counter.incr(first)
+    await counter.incr(first)
+    await counter.incr(second, amount=-1)
+
+    batch = await counter.drain()
+
+    assert batch.batch_id
+    assert batch.deltas == {first: 2, second: -1}
+    await counter.ack(batch.batch_id)
+    assert (await counter.drain()).deltas == {}
+
+
+async def test_unacked_batch_is_redelivered_with_same_id(counter):
+    # Сбой между записью в БД и ack: та же пачка с тем же id, и БД по id
+    # узнает, что уже применила ее
+    post = str(uuid4())
+    await counter.incr(post)
+    batch = await counter.drain()
+    await counter.incr(post, amount=5)
+
+    again = await counter.drain()
+
+    assert again == batch
+    await counter.ack(batch.batch_id)
+    following = await counter.drain()
+    assert following.deltas == {post: 5}
+    assert following.batch_id != batch.batch_id
+
+
+async def test_ack_of_other_batch_is_ignored(counter):
+    await counter.incr(str(uuid4()))
+    batch = await counter.drain()
+
+    await counter.ack("other")
+
+    assert await counter.drain() == batch
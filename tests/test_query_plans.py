@@ -0,0 +1,37 @@
+import argparse
+import asyncio
+
+import pytest
+
+from application.config import settings
+from benchmarks import query_plans
+
+pytestmark = pytest.mark.anyio
+
+
+async def postgres_available() -> bool:
+    try:
+        _, writer = await asyncio.wait_for(
+            asyncio.open_connection(settings.POSTGRES.host, settings.POSTGRES.port),
+            timeout=1,
+        )
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    return True
+
+
+async def test_registry_query_plans(capsys):
+    # Нужен Postgres со схемой alembic head, как и для запуска из командной строки
+    if not await postgres_available():
+        pytest.skip("Postgres недоступен")
+    args = argparse.Namespace(
+        profiles=100_000,
+        friends=10,
+        max_cost=1000,
+        host=settings.POSTGRES.host,
+        port=settings.POSTGRES.port,
+        database=settings.POSTGRES.database,
+    )
+
+    assert await query_plans.run(args) == 0, capsys.readouterr().out
@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+
+from infrastructure.cache.timeline_cache import TimelineCache
+
+pytestmark = pytest.mark.anyio
+
+
+async def read_all(timeline: TimelineCache, limit: int):
+    seen, before, before_uuid = [], None, None
+    while True:
+        page = await timeline.read(
+            "profile", limit=limit, before=before, before_uuid=before_uuid
+        )
+        seen.extend(page)
+        if len(page) < limit:
+            return seen
+        before_uuid, before = page[-1]
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 10])
+async def test_pages_keep_posts_with_equal_time(redis, limit):
+    # bulk_create дает всей пачке одно время публикации
+    timeline = TimelineCache(redis=redis)
+    now = datetime(2026, 10, 18, 12, 0)
+    batch = [uuid4() for _ in range(5)]
+    for post_uuid in batch:
+        await timeline.push(["profile"], post_uuid, now)
+    older, newer = uuid4(), uuid4()
+    await timeline.push(["profile"], older, now - timedelta(seconds=1))
+    await timeline.push(["profile"], newer, now + timedelta(seconds=1))
+
+    seen = [post_uuid for post_uuid, _ in await read_all(timeline, limit)]
+
+    assert seen == [newer, *sorted(batch, reverse=True), older]
+
+
+async def test_time_only_cursor_is_exclusive(redis):
+    timeline = TimelineCache(redis=redis)
+    now = datetime(2026, 10, 18, 12, 0)
+    post_uuid = uuid4()
+    await timeline.push(["profile"], post_uuid, now)
+
+    assert await timeline.read("profile", limit=10, before=now.timestamp()) == []